@@ -25,12 +25,13 @@ def process_inns(unique_inns, json_path, fake_api):
 
     return data
 
-def main(input_csv_path='3fssp.csv', output_dir='.', fake_api=False):
-    """Process a CSV file and save Fedresurs API responses to JSON files in the specified output directory."""
+def main(input_csv_path='3fssp.csv', output_dir='.', fake_api=False, df=None):
+    """Process a CSV file (or an already loaded DataFrame) and save Fedresurs API responses to JSON files in the specified output directory."""
     os.makedirs(output_dir, exist_ok=True)
 
-    # Read the CSV file
-    df = pd.read_csv(input_csv_path)
+    # Read the CSV file unless the caller already has the rows in memory
+    if df is None:
+        df = pd.read_csv(input_csv_path)
     
     # Check if required columns exist
     if 'inn_debtor' not in df.columns or 'inn_creditor' not in df.columns:
@@ -25,15 +25,16 @@ def load_csv_codes(path):
         return rows
 
 def match_codes(txt_data, csv_data):
+    # Index every code once; setdefault keeps the first row listing a code, as the old scan did
+    code_to_row = {}
+    for row in csv_data:
+        for code in row["codes"]:
+            code_to_row.setdefault(code, row)
+
     results = []
     for txt_code, txt_name in txt_data:
-        matched = False
-        matched_row = None
-        for row in csv_data:
-            if txt_code in row["codes"]:
-                matched = True
-                matched_row = row
-                break
+        matched_row = code_to_row.get(txt_code)
+        matched = matched_row is not None
         results.append({
             "txt_code": txt_code,
             "txt_name": txt_name,
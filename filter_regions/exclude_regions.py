@@ -1,6 +1,50 @@
-import pandas as pd
+import csv
+import itertools
+import os
 from pathlib import Path
-from region_utils import load_region_definitions, get_region_info
+
+if os.getenv("USE_MODIN"):
+    # Opt-in: modin runs the same DataFrame operations across all cores (needs modin with a Ray or Dask engine)
+    import modin.pandas as pd
+else:
+    import pandas as pd
+
+from region_utils import load_region_definitions, get_region_info_vectorized
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; pandas' own CSV reader and writer are used without it
+    pa = pa_csv = None
+
+CHUNK_ROWS = 200_000  # Rows per chunk; memory use is bounded by the chunk, not the input size
+
+def read_header(path):
+    """
+    Returns the column names from the first line of the data file, or an empty list for an empty file.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+def iter_data_chunks(path):
+    """
+    Yields the data file as DataFrame chunks with every column kept as text, so INNs keep their
+    leading zeros and cells are written back unchanged. With pyarrow the chunks come from its
+    streaming reader, with the column types pinned to string from the header.
+    """
+    if pa_csv is None:
+        yield from pd.read_csv(path, dtype=str, na_filter=False, chunksize=CHUNK_ROWS)
+        return
+    header = read_header(path)
+    if not header:
+        return
+    convert_options = pa_csv.ConvertOptions(
+        column_types={column: pa.string() for column in header}, strings_can_be_null=False, null_values=[]
+    )
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+    with pa_csv.open_csv(path, parse_options=parse_options, convert_options=convert_options) as reader:
+        for batch in reader:
+            yield pd.DataFrame(batch.to_pandas())  # a no-copy wrap with pandas; hands the chunk to modin when enabled
 
 def main():
     """
@@ -27,11 +71,15 @@ def main():
         return
 
     # --- Load and Process Data ---
+    # The file is streamed in chunks, and each chunk is filtered and appended to the output,
+    # so only one chunk is held in memory at a time.
     try:
-        df = pd.read_csv(input_data_file, dtype={'debtor_inn': str})
-        if 'debtor_inn' not in df.columns:
+        header = read_header(input_data_file)
+        if 'debtor_inn' not in header:
             print(f"Error: Input file {input_data_file} must contain a 'debtor_inn' column.")
             return
+        chunks = iter_data_chunks(input_data_file)
+        first_chunk = next(chunks, None)
     except FileNotFoundError:
         print(f"Error: Input data file not found at {input_data_file}")
         return
@@ -39,22 +87,32 @@ def main():
         print(f"An error occurred while reading the data file: {e}")
         return
 
-    # --- Identify Region for Each Row ---
-    # Apply the centralized get_region_info function
-    region_info = df['debtor_inn'].apply(lambda inn: get_region_info(inn, code_to_name))
-    df['matched_code'] = region_info.str[0]
-    df['region_name'] = region_info.str[1]
+    initial_rows = 0
+    final_rows = 0
+    with open(output_filtered_file, 'w', newline='', encoding='utf-8') as out:
+        if first_chunk is None:
+            # A header-only input still gets a header-only output, with the added region_name column
+            columns = [c for c in header if c != 'matched_code']
+            if 'region_name' not in columns:
+                columns.append('region_name')
+            pd.DataFrame(columns=columns).to_csv(out, index=False)
+        else:
+            for i, df in enumerate(itertools.chain([first_chunk], chunks)):
+                # --- Identify Region for Each Row ---
+                # Look up every INN's region in one vectorized pass with the centralized region rules
+                df['matched_code'], df['region_name'], excluded = get_region_info_vectorized(
+                    df['debtor_inn'], code_to_name, excluded_codes
+                )
 
-    # --- Filter Out Excluded Regions ---
-    # A row is kept if its matched code is NOT in the set of excluded codes
-    initial_rows = len(df)
-    filtered_df = df[~df['matched_code'].isin(excluded_codes)].copy()
-    final_rows = len(filtered_df)
+                # --- Filter Out Excluded Regions ---
+                # A row is kept if its matched code is NOT in the set of excluded codes
+                filtered_df = df[~excluded]
+                initial_rows += len(df)
+                final_rows += len(filtered_df)
 
-    # --- Save Filtered Data ---
-    # Drop the temporary helper columns before saving
-    filtered_df.drop(columns=['matched_code'], inplace=True)
-    filtered_df.to_csv(output_filtered_file, index=False)
+                # --- Save Filtered Data ---
+                # Drop the temporary helper columns before saving; the header is written with the first chunk
+                filtered_df.drop(columns=['matched_code']).to_csv(out, header=(i == 0), index=False)
 
     print(f"Processing complete.")
     print(f"Initial rows: {initial_rows}")
@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from region_utils import load_region_definitions, get_region_info
+from region_utils import load_region_definitions, get_region_info_vectorized, read_inn_column
 
 def generate_report(data_path, all_regions_path, excluded_regions_path, report_output_path):
     """
@@ -17,7 +18,7 @@ def generate_report(data_path, all_regions_path, excluded_regions_path, report_o
 
     # --- Load Data ---
     try:
-        df = pd.read_csv(data_path, dtype={'debtor_inn': str})
+        df = read_inn_column(data_path)  # the only column the report uses
         if 'debtor_inn' not in df.columns:
             print(f"Error: Input file {data_path} must contain a 'debtor_inn' column.")
             return
@@ -29,21 +30,39 @@ def generate_report(data_path, all_regions_path, excluded_regions_path, report_o
         return
 
     # --- Process Data using the utility function ---
-    region_info = df['debtor_inn'].apply(lambda inn: get_region_info(inn, code_to_name))
-    df['matched_code'] = region_info.str[0]
-    df['region_name'] = region_info.str[1]
-    df['status'] = df['matched_code'].apply(lambda x: 'Excluded' if x in excluded_codes else 'Included')
+    df['matched_code'], df['region_name'], excluded = get_region_info_vectorized(
+        df['debtor_inn'], code_to_name, excluded_codes
+    )
+    # The status comes straight from the excluded mask as category codes (0 = Excluded, 1 = Included)
+    df['status'] = pd.Categorical.from_codes((~excluded).astype(np.int8), categories=['Excluded', 'Included'])
+    # Categorical keys let the aggregation below work on small integer codes instead of strings
+    for column in ['region_name', 'matched_code']:
+        df[column] = df[column].astype('category')
 
     # --- Aggregate for Reporting ---
-    report_df = df.groupby(['region_name', 'matched_code', 'status']).agg(
-        matches=('debtor_inn', 'size'),
-        sample_debtor_inn=('debtor_inn', 'first')
-    ).reset_index()
+    # One integer key per (region_name, matched_code, status) combination, built from the category codes
+    key = (
+        df['region_name'].cat.codes.to_numpy(np.int64) * len(df['matched_code'].cat.categories)
+        + df['matched_code'].cat.codes.to_numpy(np.int64)
+    ) * 2 + excluded
+    # A single sort yields both the size of each group and its first row; rows without an INN are
+    # sorted last within their group so the sample is the first non-empty INN, as groupby's first() gives
+    order = np.lexsort((df['debtor_inn'].isna().to_numpy(), key))
+    _, first, matches = np.unique(key[order], return_index=True, return_counts=True)
+    # The report rows are gathered straight from each group's first row (categoricals keep their categories)
+    first_rows = order[first]
+    report_df = pd.DataFrame({
+        'region_name': df['region_name'].array.take(first_rows),
+        'matched_code': df['matched_code'].array.take(first_rows),
+        'status': df['status'].array.take(first_rows),
+        'matches': matches,
+        'sample_debtor_inn': df['debtor_inn'].array.take(first_rows),
+    })
 
     # Add the column with all possible codes for each region
-    report_df['all_region_codes'] = report_df['region_name'].map(name_to_codes).apply(
-        lambda x: ', '.join(sorted(x)) if x else ''
-    )
+    # (joined once per region, then mapped; the missing-regions section below reuses the strings)
+    joined_codes = {name: ', '.join(sorted(codes)) for name, codes in name_to_codes.items()}
+    report_df['all_region_codes'] = report_df['region_name'].map(joined_codes).fillna('')
     
     # Reorder columns for the final report
     report_df = report_df[[
@@ -56,9 +75,17 @@ def generate_report(data_path, all_regions_path, excluded_regions_path, report_o
     missing_regions = sorted(list(all_possible_regions - found_regions))
 
     # --- Format and Save Report ---
-    report_df.sort_values(by=['status', 'region_name', 'matched_code'], inplace=True)
+    # Sort by status, region_name, matched_code. The categories are in lexical order, so sorting their
+    # integer codes gives the same order as comparing the strings
+    order = np.lexsort((
+        report_df['matched_code'].cat.codes.to_numpy(),
+        report_df['region_name'].cat.codes.to_numpy(),
+        report_df['status'].cat.codes.to_numpy(),
+    ))
+    report_df = report_df.iloc[order]
     
-    with open(report_output_path, 'w', encoding='utf-8') as f:
+    # One large buffer, so the many small writes below reach the disk in a few system calls
+    with open(report_output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
         f.write("--- Comprehensive Region Report ---\n\n")
         
         f.write("--- Regions Found in Data File ---\n")
@@ -71,9 +98,10 @@ def generate_report(data_path, all_regions_path, excluded_regions_path, report_o
         if not missing_regions:
             f.write("All regions from the master list were found in the data file.\n")
         else:
-            for region in missing_regions:
-                codes = name_to_codes.get(region, [])
-                f.write(f"- {region} (Codes: {', '.join(sorted(codes))})\n")
+            f.write("".join(
+                f"- {region} (Codes: {joined_codes.get(region, '')})\n"
+                for region in missing_regions
+            ))
 
     print(f"Comprehensive report has been generated and saved to:\n{report_output_path}")
 
@@ -1,5 +1,23 @@
+import csv
+import functools
+import os
+import numpy as np
 import pandas as pd
 from collections import defaultdict
+from itertools import chain
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; pandas' own CSV reader is used without it
+    pa = pc = pa_csv = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; region ids are then resolved with plain NumPy
+    njit = None
+    prange = range
 
 def load_region_definitions(all_regions_path, excluded_regions_path):
     """
@@ -17,32 +35,78 @@ def load_region_definitions(all_regions_path, excluded_regions_path):
             - all_regions_df (pd.DataFrame): DataFrame from all_regions.csv.
     """
     try:
-        all_regions_df = pd.read_csv(all_regions_path)
-        excluded_regions_df = pd.read_csv(excluded_regions_path)
+        # The files' modification time and size are part of the cache key, so an edited file is re-read
+        all_regions_stamp = file_stamp(all_regions_path)
+        excluded_regions_stamp = file_stamp(excluded_regions_path)
     except FileNotFoundError as e:
         print(f"Error: Required region definition file not found. {e}")
         return None, None, None, None
+    return parse_region_definitions(
+        all_regions_path, excluded_regions_path, all_regions_stamp, excluded_regions_stamp
+    )
+
+def file_stamp(path):
+    """(modification time, size) of a file; raises FileNotFoundError if it is missing."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+@functools.lru_cache(maxsize=4)
+def parse_region_definitions(all_regions_path, excluded_regions_path, all_regions_stamp, excluded_regions_stamp):
+    """
+    Parses the region definition files for load_region_definitions. Cached per path and file stamp,
+    so repeated loads in one process reuse the parsed maps; callers must not modify them.
+    """
+    all_regions_df = pd.read_csv(all_regions_path)
+    excluded_regions_df = pd.read_csv(excluded_regions_path)
 
-    code_to_name_map = {}
-    name_to_codes_map = defaultdict(list)
     # Process all regions to build the primary code-to-name mapping
-    for _, row in all_regions_df.iterrows():
-        region_name = row['region']
-        # Handle potentially non-string 'inns' column and split
-        codes = [code.strip() for code in str(row['inns']).split(',') if code.strip()]
-        for code in codes:
-            code_to_name_map[code] = region_name
-            name_to_codes_map[region_name].append(code)
-
-    # Process excluded regions to build the set of excluded codes
-    excluded_codes = set()
-    for _, row in excluded_regions_df.iterrows():
-        codes = [code.strip() for code in str(row['inns']).split(',') if code.strip()]
-        for code in codes:
-            excluded_codes.add(code)
+    codes = split_codes(all_regions_df['inns'])
+    regions = all_regions_df['region'].reindex(codes.index)
+    code_to_name_map = dict(zip(codes, regions))
+    name_to_codes_map = defaultdict(list, codes.groupby(regions, sort=False).agg(list).to_dict())
+
+    # INN prefixes are matched at 3 and 2 digits only; any other code could never match
+    unmatchable = sorted(code for code in code_to_name_map if len(code) not in (2, 3))
+    if unmatchable:
+        print(f"Warning: region codes {unmatchable} are not 2 or 3 digits long and will never match an INN.")
+
+    # Process excluded regions to build the set of excluded codes. Only the codes themselves are needed,
+    # so a plain comprehension does it without the row alignment (and overhead) of split_codes
+    excluded_lists = (str(inns).split(',') for inns in excluded_regions_df['inns'].tolist())
+    excluded_codes = {code.strip() for code in chain.from_iterable(excluded_lists)} - {''}
     
     return code_to_name_map, excluded_codes, name_to_codes_map, all_regions_df
 
+def read_inn_column(data_path, column='debtor_inn'):
+    """
+    Reads only the INN column of a data file as text, skipping the parsing of every other column.
+    Empty cells are NaN, as with pd.read_csv. If the file has no such column, the DataFrame comes
+    back without it, so callers can report that themselves.
+    """
+    if pa_csv is None:
+        return pd.read_csv(data_path, usecols=lambda name: name == column, dtype={column: str})
+    with open(data_path, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader(f), [])
+    if column not in header:
+        return pd.DataFrame()
+    table = pa_csv.read_csv(
+        data_path,
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=[column], column_types={column: pa.string()}, strings_can_be_null=True
+        ),
+    )
+    return table.to_pandas()
+
+def split_codes(inns_column):
+    """
+    Splits a column of comma-separated region codes into one stripped, non-empty code per row.
+    The result keeps the index of the row each code came from.
+    """
+    # Handle potentially non-string 'inns' values the way str() does
+    codes = inns_column.map(str).str.split(',').explode().str.strip()
+    return codes[codes != '']
+
 def get_region_info(inn_raw, code_to_name_map):
     """
     Determines region code and name from an INN based on its prefix.
@@ -58,13 +122,12 @@ def get_region_info(inn_raw, code_to_name_map):
         tuple: A tuple of (matched_code, region_name). Returns ('Invalid', 'Invalid INN')
                for non-compliant INNs.
     """
-    inn = str(inn_raw)
-    # Handle 9-digit INNs by prepending a '0'
+    inn = inn_raw if isinstance(inn_raw, str) else str(inn_raw)
+    # Handle 9-digit INNs by prepending a '0'; only they need a new string
     if len(inn) == 9 and inn.isdigit():
         inn = '0' + inn
-    
-    # INN must be exactly 10 digits
-    if not inn.isdigit() or len(inn) != 10:
+    # INN must be exactly 10 digits (the cheap length test runs first)
+    elif len(inn) != 10 or not inn.isdigit():
         return "Invalid", "Invalid INN"
     
     # Check for a 3-digit prefix first, as it's more specific
@@ -78,4 +141,179 @@ def get_region_info(inn_raw, code_to_name_map):
         return prefix_2, code_to_name_map[prefix_2]
 
     # If no match is found at all
-    return "Unknown", "Unknown Code"
\ No newline at end of file
+    return "Unknown", "Unknown Code"
+
+# Region ids index one table of codes: 0-99 are the 2-digit codes, 100-1099 the 3-digit ones,
+# followed by the two catch-all labels
+THREE_DIGIT_OFFSET = 100
+UNKNOWN_ID = 1100
+INVALID_ID = 1101
+
+def inn_chars(inns):
+    """
+    Returns the INNs as an (N, 11) uint32 array of character code points. The slot past 10 characters
+    shows when a string is longer; shorter ones are padded with 0 (NUL).
+    """
+    return inns.astype(str).fillna('').to_numpy(dtype='U11').view(np.uint32).reshape(len(inns), 11)
+
+def inn_prefixes(chars):
+    """
+    Reads the region prefixes of INNs (as returned by inn_chars) as integers.
+
+    Returns:
+        tuple: (valid, prefix_2, prefix_3) NumPy arrays. `valid` marks INNs of 10 ASCII digits, or 9 digits
+               (padded with a leading '0' as in get_region_info); prefix_2/prefix_3 are the values of the
+               first 2/3 digits after padding and are 0 where `valid` is False.
+    """
+    digits = chars - np.uint32(ord('0'))  # non-digits wrap around to large values
+    is_digit = digits < 10
+    ten = is_digit[:, :10].all(axis=1) & (chars[:, 10] == 0)
+    nine = is_digit[:, :9].all(axis=1) & (chars[:, 9] == 0)
+    d0, d1, d2 = (digits[:, i].astype(np.int64) for i in range(3))
+    prefix_3 = np.where(ten, d0 * 100 + d1 * 10 + d2, d0 * 10 + d1)
+    prefix_2 = np.where(ten, d0 * 10 + d1, d0)
+    valid = ten | nine
+    return valid, np.where(valid, prefix_2, 0), np.where(valid, prefix_3, 0)
+
+def is_arrow_string(series):
+    """
+    True if the Series holds its strings in Arrow buffers: pandas' default str dtype (with pyarrow),
+    'string[pyarrow]', or ArrowDtype strings as read with dtype_backend='pyarrow'.
+    """
+    if pc is None:
+        return False
+    dtype = series.dtype
+    if isinstance(dtype, pd.StringDtype):
+        return dtype.storage == 'pyarrow'
+    if isinstance(dtype, pd.ArrowDtype):
+        return pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype)
+    return False
+
+def arrow_inn_prefixes(inns):
+    """
+    Same result as inn_prefixes, computed by pyarrow kernels directly on the UTF-8 bytes of an
+    Arrow-backed string Series, without first copying the strings into a fixed-width NumPy array.
+    """
+    inn = pa.array(inns)
+    length = pc.binary_length(inn)
+    valid = pc.fill_null(
+        pc.and_(pc.ascii_is_decimal(inn), pc.or_(pc.equal(length, 10), pc.equal(length, 9))), False
+    )
+    # 9-digit INNs are padded with a leading '0' as in get_region_info; invalid ones read as prefix 0
+    padded = pc.if_else(valid, pc.utf8_lpad(inn, 10, '0'), '0000000000')
+    prefix_3 = pc.cast(pc.utf8_slice_codeunits(padded, 0, 3), pa.int64()).to_numpy()
+    return valid.to_numpy(zero_copy_only=False), prefix_3 // 10, prefix_3
+
+def region_ids_from_prefixes(valid, prefix_2, prefix_3, has_code):
+    """Region id of every INN, resolved from its prefixes with whole-column NumPy operations."""
+    prefix_3 = prefix_3 + THREE_DIGIT_OFFSET
+    # A 3-digit prefix is more specific, so it wins over the 2-digit one
+    ids = np.where(has_code[prefix_3], prefix_3, np.where(has_code[prefix_2], prefix_2, UNKNOWN_ID))
+    return np.where(valid, ids, INVALID_ID)
+
+def _region_ids_loop(chars, has_code, ids):
+    """The same resolution as region_ids_from_prefixes, one INN at a time; the body of the numba kernel."""
+    for i in prange(chars.shape[0]):
+        row = chars[i]
+        length = 0
+        while length < 10 and 48 <= row[length] <= 57:
+            length += 1
+        if length < 9 or row[length] != 0:
+            ids[i] = INVALID_ID
+            continue
+        d0, d1, d2 = row[0] - 48, row[1] - 48, row[2] - 48
+        if length == 10:
+            prefix_3, prefix_2 = d0 * 100 + d1 * 10 + d2, d0 * 10 + d1
+        else:  # 9 digits, read as if padded with a leading '0'
+            prefix_3, prefix_2 = d0 * 10 + d1, d0
+        if has_code[THREE_DIGIT_OFFSET + prefix_3]:
+            ids[i] = THREE_DIGIT_OFFSET + prefix_3
+        elif has_code[prefix_2]:
+            ids[i] = prefix_2
+        else:
+            ids[i] = UNKNOWN_ID
+
+region_ids_kernel = njit(parallel=True, cache=True)(_region_ids_loop) if njit is not None else None
+
+def build_region_tables(code_to_name_map, excluded_codes=()):
+    """
+    Builds the tables indexed by region id: (codes, names, has_code, excluded).
+    A row's code, name and excluded flag all come from one resolved id, so the name lookup and the
+    excluded-codes membership test are a single gather per row rather than two hash lookups.
+    The tables are filled from the maps split by code length instead of probing every possible prefix.
+    """
+    codes = np.array(
+        [f"{i:02d}" for i in range(100)] + [f"{i:03d}" for i in range(1000)] + ["Unknown", "Invalid"],
+        dtype=object,
+    )
+    names = np.full(len(codes), None, dtype=object)
+    names[UNKNOWN_ID], names[INVALID_ID] = "Unknown Code", "Invalid INN"
+    has_code = np.zeros(len(codes), dtype=np.bool_)
+    excluded = np.zeros(len(codes), dtype=np.bool_)
+    names_by_length = split_by_code_length(code_to_name_map)
+    excluded_by_length = split_by_code_length(dict.fromkeys(excluded_codes, True))
+    for length, offset in ((2, 0), (3, THREE_DIGIT_OFFSET)):
+        for prefix, name in names_by_length[length].items():
+            names[offset + prefix] = name
+            has_code[offset + prefix] = True
+        excluded[[offset + prefix for prefix in excluded_by_length[length]]] = True
+    # Catch-all labels can be listed as excluded too, as with a plain isin() on the codes
+    excluded[UNKNOWN_ID] = "Unknown" in excluded_codes
+    excluded[INVALID_ID] = "Invalid" in excluded_codes
+    return codes, names, has_code, excluded
+
+def split_by_code_length(code_map):
+    """
+    Splits a code-keyed dict into {2: {prefix: value}, 3: {prefix: value}}, keyed by the codes'
+    integer values. Codes that are not 2 or 3 ASCII digits can never match an INN prefix and are dropped.
+    """
+    by_length = {2: {}, 3: {}}
+    for code, value in code_map.items():
+        if len(code) in by_length and code.isascii() and code.isdigit():
+            by_length[len(code)][int(code)] = value
+    return by_length
+
+def get_region_info_vectorized(inns, code_to_name_map, excluded_codes=()):
+    """
+    Column-wide version of get_region_info: same rules, applied with integer prefixes and
+    lookup tables indexed by them instead of a Python call (or a string hash) per row.
+    With numba installed the prefixes are resolved by a parallel JIT kernel in a single pass.
+
+    Args:
+        inns (pd.Series): The INNs to process (str or int).
+        code_to_name_map (dict): A dictionary mapping region codes to region names.
+        excluded_codes (set): Region codes whose rows are flagged in the returned mask.
+
+    Returns:
+        tuple: A tuple of (matched_codes, region_names, excluded) aligned with `inns`; the first two
+               are Series and `excluded` is a boolean NumPy array.
+    """
+    codes, names, has_code, excluded = build_region_tables(code_to_name_map, excluded_codes)
+    if is_arrow_string(inns):
+        # Arrow-backed strings are validated in place, byte by byte
+        ids = region_ids_from_prefixes(*arrow_inn_prefixes(inns), has_code)
+    elif region_ids_kernel is not None:
+        chars = inn_chars(inns)
+        ids = np.empty(len(chars), dtype=np.int64)
+        region_ids_kernel(chars, has_code, ids)
+    else:
+        ids = region_ids_from_prefixes(*inn_prefixes(inn_chars(inns)), has_code)
+
+    matched_codes, region_names, is_excluded = codes[ids], names[ids], excluded[ids]
+
+    # INN must be exactly 10 digits. isdigit() also accepts non-ASCII digits, which the integer
+    # prefixes above read as invalid, while get_region_info accepts them and can still match their
+    # leading ASCII digits; those rare INNs are resolved by get_region_info itself.
+    invalid = ids == INVALID_ID
+    if invalid.any():
+        inn = inns[invalid].astype(str).fillna('')
+        odd_digits = (inn.str.isdigit() & inn.str.len().isin((9, 10))).to_numpy()
+        for row, inn_raw in zip(np.flatnonzero(invalid)[odd_digits], inn[odd_digits]):
+            matched_codes[row], region_names[row] = get_region_info(inn_raw, code_to_name_map)
+            is_excluded[row] = matched_codes[row] in excluded_codes
+
+    return (
+        pd.Series(matched_codes, index=inns.index, dtype=object),
+        pd.Series(region_names, index=inns.index, dtype=object),
+        is_excluded,
+    )
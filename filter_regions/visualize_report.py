@@ -1,7 +1,7 @@
-import pandas as pd
+import numpy as np
 import plotly.express as px
 from pathlib import Path
-from region_utils import load_region_definitions, get_region_info
+from region_utils import load_region_definitions, get_region_info_vectorized, read_inn_column
 
 def create_visualizations(data_path, all_regions_path, excluded_regions_path, output_dir):
     """
@@ -18,7 +18,7 @@ def create_visualizations(data_path, all_regions_path, excluded_regions_path, ou
 
     # --- Load Data ---
     try:
-        df = pd.read_csv(data_path, dtype={'debtor_inn': str})
+        df = read_inn_column(data_path)  # the only column the report uses
         if 'debtor_inn' not in df.columns:
             print(f"Error: Input file {data_path} must contain a 'debtor_inn' column.")
             return
@@ -30,10 +30,10 @@ def create_visualizations(data_path, all_regions_path, excluded_regions_path, ou
         return
 
     # --- Process Data using the utility function ---
-    region_info = df['debtor_inn'].apply(lambda inn: get_region_info(inn, code_to_name))
-    df['matched_code'] = region_info.str[0]
-    df['region_name'] = region_info.str[1]
-    df['status'] = df['matched_code'].apply(lambda x: 'Excluded' if x in excluded_codes else 'Included')
+    df['matched_code'], df['region_name'], excluded = get_region_info_vectorized(
+        df['debtor_inn'], code_to_name, excluded_codes
+    )
+    df['status'] = np.where(excluded, 'Excluded', 'Included')
 
     # --- Aggregate Data for Visualization ---
     # Group by region name and status, then sum the number of matches
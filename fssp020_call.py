@@ -1,25 +1,74 @@
+import json
 import requests
 import time
 import dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from parse_court_links.rate_limit import API_RATE_LIMITER
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib parser is used without it
+    orjson = None
 
 dotenv.load_dotenv()
 TOKEN = dotenv.get_key(dotenv.find_dotenv(), "api_cloud")
 
+API_MAX_ATTEMPTS = 4  # Attempts per call when the API answers 429 or 5xx
+API_BACKOFF_BASE = 0.5  # Seconds; doubled after each throttled attempt
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Reuse one keep-alive connection to api-cloud.ru instead of a new TCP+TLS handshake per call.
+# Only connection failures are retried here: HTTP statuses are resent by get_with_backoff, and read
+# timeouts are not resent because the API bills the request (read=False, unlike read=0, re-raises the
+# timeout itself, so api_call still reports it as one).
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, read=False, backoff_factor=0.5),
+))
+
+
+def get_with_backoff(url, timeout):
+    """
+    Sends a GET request paced by the shared API_RATE_LIMITER, backing off exponentially while the API
+    answers 429 or 5xx. A Retry-After header, when sent, sets the minimum wait. Rejected attempts take
+    a token too, so resends count against the request rate. The last response is returned once attempts run out.
+    """
+    for attempt in range(1, API_MAX_ATTEMPTS + 1):
+        API_RATE_LIMITER.acquire()
+        response = SESSION.get(url, timeout=timeout)
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == API_MAX_ATTEMPTS:
+            return response
+        delay = API_BACKOFF_BASE * 2 ** (attempt - 1)
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+    return response
+
+
 # Combined API call function (fake or real based on FAKE_API)
-def api_call(ip, FAKE_API=True):
+def api_call(ip, FAKE_API=True, timeout=400):
     if FAKE_API:
         time.sleep(2)  # Simple 2-second delay for fake call
         return {"status": 200, "data": f"Fake response for {ip}"}
     else:
         url = f"https://api-cloud.ru/api/fssp.php?type=ip&number={ip}&token={TOKEN}"
         try:
-            response = requests.get(url, timeout=400)
+            response = get_with_backoff(url, timeout)
             response.raise_for_status()  # Raise exception for bad status codes
-            return response.json()
+            # Parse the raw bytes directly; orjson is several times faster than the stdlib decoder
+            return orjson.loads(response.content) if orjson is not None else json.loads(response.content)
+        except ValueError:  # malformed JSON body, reported like response.json()'s error used to be
+            return {"status": 500}
         except requests.exceptions.Timeout:
             return {"status": "timeout"}
         except requests.exceptions.RequestException as e:
-            return {"status": e.response.status_code if e.response else 500}
+            # An error Response is falsy, so test it against None to keep its status code
+            return {"status": e.response.status_code if e.response is not None else 500}
         
 
 
@@ -1,56 +1,93 @@
 import pandas as pd
-import requests
-import time
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from fssp020_call import api_call
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used without it
+    orjson = None
 
-# Global variables
-CURRENT_TIMEOUT = 400           # Starting timeout in seconds
+
+API_WORKERS = 8                 # FSSP requests in flight at once; calls wait on the network, not the CPU
+MIN_TIMEOUT = 60                # Seconds; floor the timeout shrinks to after successful calls
+MAX_TIMEOUT = 400               # Seconds; starting timeout and ceiling after timeouts
+
+# Adaptive request timeout: shrinks while calls succeed, grows after a timeout.
+# Each worker thread gets its own controller, so no state is shared between threads.
+class TimeoutController:
+    __slots__ = ('cur',)
+
+    def __init__(self, start=MAX_TIMEOUT):
+        self.cur = start
+
+    def suggest(self):
+        return self.cur
+
+    def record(self, ok):
+        self.cur = max(MIN_TIMEOUT, self.cur * 0.8) if ok else min(MAX_TIMEOUT, self.cur * 1.5)
 
 # Process a single row with dynamic timeout (metadata removed)
-def process_row(row, index, fake_api):
-    ip = row["ip"]  # Assumes 'ip' column exists in CSV
-    start_time = time.time()
-    response = api_call(ip, fake_api)
-    end_time = time.time()
-    # Return row with response only
-    return {"fssp_resp": json.dumps(response, ensure_ascii=False)}
-
-# Save responses to CSV
-def save_to_csv(data, filepath, append=False):
-    df = pd.DataFrame(data)
-    if append and os.path.exists(filepath):
-        df.to_csv(filepath, mode='a', header=False, index=False, encoding='utf-8-sig')
-    else:
-        df.to_csv(filepath, index=False, encoding='utf-8-sig')
-    print(f'saved {data} to {filepath}')
+def process_row(tc, ip, index, fake_api):
+    timeout = tc.suggest()
+    response = api_call(ip, fake_api, timeout=timeout)
+    tc.record(response.get("status") != "timeout")
+    if response.get("status") == "timeout" and timeout < MAX_TIMEOUT:
+        # A slow call the full timeout would have let finish is resent once with it; timeouts at MAX_TIMEOUT are final
+        response = api_call(ip, fake_api, timeout=MAX_TIMEOUT)
+    return response
+
+# One JSON object per line; the next stage reads the parsed responses back without a CSV text cell in between
+def encode_response(response):
+    if orjson is not None:
+        return orjson.dumps(response) + b"\n"
+    return (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
 
 # Main function to process CSV and save results
 # Now accepts input and output paths as arguments for pipeline compatibility
-def main(input_csv_path, output_csv_path, fake_api=False):
+# Returns the parsed responses in input order, as saved to the JSONL file
+def main(input_csv_path, output_path, fake_api=False):
     df = pd.read_csv(input_csv_path)
-    results = []         # Store API responses
 
-    # Handle output.csv filename logic
+    # Handle output.jsonl filename logic
     date_str = datetime.now().strftime("%d%m%y")
-    base, ext = os.path.splitext(output_csv_path)
+    base, ext = os.path.splitext(output_path)
     output_path = f"{base}{date_str}{ext}"
     counter = 1
     while os.path.exists(output_path):
         output_path = f"{base}{date_str}_{counter}{ext}"
         counter += 1
 
-    # Process each row
-    for index, row in df.iterrows():
-        result = process_row(row.to_dict(), index, fake_api)
-        results.append(result)
-        save_to_csv([result], output_path, append=True)
+    # Process each unique ip once; repeated rows would only repeat the same API call
+    unique_df = df.drop_duplicates(subset=['ip'])
+    print(f'{len(unique_df)} unique ips out of {len(df)} rows')
+    responses = []  # also kept in memory so a pipeline can pass them on without re-reading the file
+    # Open the output once and append one line per response instead of rebuilding a DataFrame per row
+    with open(output_path, 'wb') as f:
+        # Only the 'ip' column is needed, so iterate over a plain list instead of boxing each row into a Series.
+        # Calls run concurrently; map() still yields the results in input order for the writer.
+        worker_state = threading.local()
+
+        def run(item):
+            tc = getattr(worker_state, 'tc', None)
+            if tc is None:
+                tc = worker_state.tc = TimeoutController()
+            return process_row(tc, item[1], item[0], fake_api)
+
+        with ThreadPoolExecutor(max_workers=API_WORKERS) as executor:
+            results = executor.map(run, zip(unique_df.index, unique_df['ip'].tolist()))
+            for result in results:
+                responses.append(result)
+                f.write(encode_response(result))
+                f.flush()  # keep every finished response on disk if the run is interrupted
+                print(f'saved {result} to {output_path}')
+    return responses
 
 # Run the script
 if __name__ == "__main__":
     INPUT_CSV_PATH = 'example.csv'  # Default input CSV path
-    OUTPUT_CSV_PATH = 'output.csv'   # Default output CSV path
-    main(input_csv_path=INPUT_CSV_PATH, output_csv_path=OUTPUT_CSV_PATH, fake_api=False)
\ No newline at end of file
+    OUTPUT_PATH = 'output.jsonl'     # Default output JSONL path
+    main(input_csv_path=INPUT_CSV_PATH, output_path=OUTPUT_PATH, fake_api=False)
\ No newline at end of file
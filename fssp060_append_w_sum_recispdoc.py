@@ -2,14 +2,20 @@ import pandas as pd
 import json
 import re
 
-def extract_sum_recispdoc_from_csv(csv_path):
-    """Read a CSV file with 'fssp_resp' column, extract process_title, recispdoc name, and sum."""
-    df = pd.read_csv(csv_path)
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib parser is used without it
+    orjson = None
+
+def extract_sum_recispdoc(responses):
+    """Extract process_title, recispdoc name, and sum from parsed FSSP API responses."""
     result = {}
-    for index, row in df.iterrows():
-        fssp_resp = row['fssp_resp']
-        data = json.loads(fssp_resp)
-        record = data['records'][0]
+    for data in responses:
+        # Timed-out and failed calls come back as a bare status with no records; their ips stay 'Not Found'
+        records = data.get('records')
+        if not records:
+            continue
+        record = records[0]
         process_title = record['process_title']
         rec_isp_doc = record['recIspDoc']
         sum_value = record['sum']
@@ -19,6 +25,35 @@ def extract_sum_recispdoc_from_csv(csv_path):
         result[process_title] = {"recispdoc": name, "sum": sum_value}
     return result
 
+def iter_jsonl(jsonl_path):
+    """Yield one parsed response per non-empty line of a JSONL file."""
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(jsonl_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield loads(line)
+
+def extract_sum_recispdoc_from_jsonl(jsonl_path):
+    """Read a JSONL file of FSSP API responses, extract process_title, recispdoc name, and sum."""
+    return extract_sum_recispdoc(iter_jsonl(jsonl_path))
+
+def extract_sum_recispdoc_from_df(df):
+    """Extract process_title, recispdoc name, and sum from a DataFrame with a 'fssp_resp' column."""
+    return extract_sum_recispdoc(json.loads(fssp_resp) for fssp_resp in df['fssp_resp'])
+
+def extract_sum_recispdoc_from_csv(csv_path):
+    """Read a CSV file with 'fssp_resp' column (older fssp050 output), extract process_title, recispdoc name, and sum."""
+    return extract_sum_recispdoc_from_df(pd.read_csv(csv_path))
+
+def add_sum_recispdoc_to_df(df, info):
+    """Return a copy of df with recispdoc and sum columns looked up by ip in the info dict."""
+    if 'ip' not in df.columns:
+        raise ValueError("Input CSV must have 'ip' column")
+    df = df.copy()
+    df['recispdoc'] = df['ip'].map(lambda x: info.get(x, {}).get('recispdoc', 'Not Found'))
+    df['sum'] = df['ip'].map(lambda x: info.get(x, {}).get('sum', 'Not Found'))
+    return df
+
 def add_sum_recispdoc_to_csv(input_csv_path, info_or_path, output_csv_path):
     """Add recispdoc and sum columns to a CSV based on ip from a JSON file or dict."""
     if isinstance(info_or_path, dict):
@@ -26,15 +61,11 @@ def add_sum_recispdoc_to_csv(input_csv_path, info_or_path, output_csv_path):
     else:
         with open(info_or_path, 'r', encoding='utf-8') as f:
             info = json.load(f)
-    df = pd.read_csv(input_csv_path)
-    if 'ip' not in df.columns:
-        raise ValueError("Input CSV must have 'ip' column")
-    df['recispdoc'] = df['ip'].map(lambda x: info.get(x, {}).get('recispdoc', 'Not Found'))
-    df['sum'] = df['ip'].map(lambda x: info.get(x, {}).get('sum', 'Not Found'))
-    df.to_csv(output_csv_path, index=False)
+    add_sum_recispdoc_to_df(pd.read_csv(input_csv_path), info).to_csv(output_csv_path, index=False)
 
-# Usage example:
-info = extract_sum_recispdoc_from_csv('output300625_1.csv')
-# with open('info_2.json', 'w', encoding='utf-8') as f:
-#     json.dump(info, f, ensure_ascii=False, indent=4)
-add_sum_recispdoc_to_csv('example.csv', info, 'fssp_2.csv') # or 'info.json'
\ No newline at end of file
+# Usage example (guarded so that importing this module from pipeline.py does not run it):
+if __name__ == "__main__":
+    info = extract_sum_recispdoc_from_jsonl('output300625_1.jsonl')
+    # with open('info_2.json', 'w', encoding='utf-8') as f:
+    #     json.dump(info, f, ensure_ascii=False, indent=4)
+    add_sum_recispdoc_to_csv('example.csv', info, 'fssp_2.csv') # or 'info.json'
\ No newline at end of file
@@ -1,20 +1,18 @@
 import pandas as pd
 
-def process_csv(input_csv_path, output_csv_path, filter_sum=True, include_groupsum=True):
+def process_df(df, filter_sum=True, include_groupsum=True):
     """
-    Process a CSV file to group rows by inn_debtor and inn_creditor, calculate groupsum,
-    and produce a new CSV with specified columns, sorting, and optional filtering.
+    Group rows of a DataFrame by inn_debtor and inn_creditor, calculate groupsum,
+    and return a new DataFrame with specified columns, sorting, and optional filtering.
 
     Parameters:
-    - input_csv_path (str): Path to the input CSV file.
-    - output_csv_path (str): Path to save the output CSV file.
+    - df (pd.DataFrame): Input rows with ip, inn_creditor, inn_debtor, sum and recispdoc columns.
     - filter_sum (bool): If True, remove rows where sum < 2.5 million in the final output.
     - include_groupsum (bool): If True, calculate and include the groupsum column in the output.
     """
-    # Step 1: Read the CSV into a pandas DataFrame
-    df = pd.read_csv(input_csv_path)
-
     # Step 2: Calculate groupsum (if required)
+    # pipeline.py passes its own DataFrame in, so work on a copy and never add columns to the caller's rows
+    df = df.copy()
     if include_groupsum:
         # Group by inn_debtor and inn_creditor, sum the 'sum' column
         groupsum_df = df.groupby(['inn_debtor', 'inn_creditor'])['sum'].sum().reset_index()
@@ -38,10 +36,20 @@ def process_csv(input_csv_path, output_csv_path, filter_sum=True, include_groups
     columns = ['ip', 'inn_creditor', 'inn_debtor', 'sum', 'recispdoc']
     if include_groupsum:
         columns.append('groupsum')
-    df = df[columns]
+    return df[columns]
+
+def process_csv(input_csv_path, output_csv_path, filter_sum=True, include_groupsum=True):
+    """
+    Process a CSV file with process_df and save the result to a new CSV.
 
-    # Step 6: Save the processed DataFrame to a new CSV file
-    df.to_csv(output_csv_path, index=False)
+    Parameters:
+    - input_csv_path (str): Path to the input CSV file.
+    - output_csv_path (str): Path to save the output CSV file.
+    - filter_sum (bool): If True, remove rows where sum < 2.5 million in the final output.
+    - include_groupsum (bool): If True, calculate and include the groupsum column in the output.
+    """
+    df = pd.read_csv(input_csv_path)
+    process_df(df, filter_sum=filter_sum, include_groupsum=include_groupsum).to_csv(output_csv_path, index=False)
 
 # Example usage
 if __name__ == "__main__":
@@ -2,9 +2,11 @@
 
 import json
 import logging
+import re
 from pathlib import Path
 from typing import Any, Dict, List
 
+import numpy as np
 import pandas as pd
 
 # --- Configuration ---
@@ -22,6 +24,11 @@ logging.basicConfig(
 RESULT_NO_CASES_FOUND = "нет результатов, нужна ручная проверка"
 RESULT_NO_SUITABLE_DOCS = "Подходящие документы не найдены"
 
+# --- Event classification rules ---
+DECISION_EVENT_TYPE = "Решение"
+MIXED_DECISION_EVENT_TYPE = "Решения и постановления"
+DECISION_CONTENT_RE = re.compile("решение", re.IGNORECASE)  # matched without lowercasing a copy of each ContentTypes entry
+
 # --- Type Hinting Aliases ---
 JsonDict = Dict[str, Any]
 Document = Dict[str, str]
@@ -53,17 +60,18 @@ def filter_and_extract_documents(case_info_json: JsonDict, debtor_inn: str, cred
 
     # --- 1. Validate Participant Roles (Crucial Step) ---
     participants = case_info_json.get("Result", {}).get("Participants", {})
-    plaintiff_inns = {p.get("INN") for p in participants.get("Plaintiffs", []) if p.get("INN")}
-    
-    # Corrected this line as per your bug find (r.get instead of p.get)
-    respondent_inns = {r.get("INN") for r in participants.get("Respondents", []) if r.get("INN")}
+    plaintiffs = participants.get("Plaintiffs") or ()
+    respondents = participants.get("Respondents") or ()
 
-    # Check if our specific creditor is among the plaintiffs AND our debtor is among the respondents
-    is_creditor_plaintiff = creditor_inn in plaintiff_inns
-    is_debtor_respondent = debtor_inn in respondent_inns
+    # Check if our specific creditor is among the plaintiffs AND our debtor is among the respondents.
+    # any() stops at the first match; the full INN sets are only built for the mismatch warning.
+    is_creditor_plaintiff = bool(creditor_inn) and any(p.get("INN") == creditor_inn for p in plaintiffs)
+    is_debtor_respondent = bool(debtor_inn) and any(r.get("INN") == debtor_inn for r in respondents)
 
     if not (is_creditor_plaintiff and is_debtor_respondent):
         case_id = case_info_json.get("Result", {}).get("CaseInfo", {}).get("CaseId", "N/A")
+        plaintiff_inns = {p.get("INN") for p in plaintiffs if p.get("INN")}
+        respondent_inns = {r.get("INN") for r in respondents if r.get("INN")}
         logging.warning(
             f"Role mismatch for CaseId {case_id}. "
             f"Expected Debtor(Resp): {debtor_inn}, Creditor(Plaint): {creditor_inn}. "
@@ -77,33 +85,35 @@ def filter_and_extract_documents(case_info_json: JsonDict, debtor_inn: str, cred
 
     for instance in case_instances:
         for event in instance.get("InstanceEvents", []):
+            # Unpack each event once; most have no file, so they are ruled out before classification
+            file_url = event.get("File")
+            doc_date = event.get("Date")
+            if not (file_url and doc_date):
+                continue
             event_type = event.get("EventTypeName", "")
-            content_types = event.get("ContentTypes", [])
-            
+
             # Rule 1: EventTypeName is exactly "Решение"
-            is_direct_decision = (event_type == "Решение")
-            
+            is_direct_decision = (event_type == DECISION_EVENT_TYPE)
+
             # Rule 2: EventTypeName is "Решения и постановления" AND ContentTypes contains "решение"
             is_filtered_decision = (
-                event_type == "Решения и постановления" and
-                any("решение" in str(ct).lower() for ct in content_types)
+                event_type == MIXED_DECISION_EVENT_TYPE and
+                any(isinstance(ct, str) and DECISION_CONTENT_RE.search(ct) for ct in event.get("ContentTypes") or ())
             )
 
-            if (is_direct_decision or is_filtered_decision) and event.get("File") and event.get("Date"):
-                doc = {"Date": event["Date"], "File": event["File"]}
+            if is_direct_decision or is_filtered_decision:
+                doc = {"Date": doc_date, "File": file_url}
                 documents.append(doc)
                 logging.info(f"  -> Found matching document in CaseId {case_info_json.get('Result', {}).get('CaseInfo', {}).get('CaseId', 'N/A')}: {doc['Date']}")
 
     return documents
 
 
-def process_inn_pair(row: pd.Series, search_data: JsonDict, case_details_data: JsonDict) -> str:
+def process_inn_pair(debtor_inn: str, creditor_inn: str, search_data: JsonDict, case_details_data: JsonDict) -> str:
     """
-    Processes a single row (INN pair) by looking up data in the provided JSONs,
+    Processes a single INN pair by looking up data in the provided JSONs,
     filtering, and formatting the final result string.
     """
-    debtor_inn = row['debtor_inn']
-    creditor_inn = row['creditor_inn']
     processing_key = f"{debtor_inn}|{creditor_inn}"
     
     logging.info(f"--- Processing Key: {processing_key} ---")
@@ -134,12 +144,10 @@ def process_inn_pair(row: pd.Series, search_data: JsonDict, case_details_data: J
         return RESULT_NO_SUITABLE_DOCS
 
     try:
-        # Sort documents by date, newest first
-        sorted_docs = sorted(
-            all_documents, 
-            key=lambda x: pd.to_datetime(x['Date'], format='%d.%m.%Y', errors='coerce'), 
-            reverse=True
-        )
+        # Sort documents by date, newest first. All dates are parsed in one vectorized call; unparseable ones go last.
+        dates = pd.Series(pd.to_datetime([doc['Date'] for doc in all_documents], format='%d.%m.%Y', errors='coerce', cache=True))
+        order = dates.sort_values(ascending=False, kind='stable', na_position='last').index
+        sorted_docs = [all_documents[i] for i in order]
     except (ValueError, KeyError) as e:
         logging.warning(f"Could not sort documents by date for key '{processing_key}' due to format error: {e}. Using original order.")
         sorted_docs = all_documents
@@ -165,7 +173,7 @@ def main():
 
     # --- Load all necessary data ---
     try:
-        df = pd.read_csv(input_csv_path, dtype=str).fillna('')
+        df = pd.read_csv(input_csv_path, dtype=str, engine='c', memory_map=True, na_filter=False)
         search_data = load_or_create_json(search_results_path)
         case_details_data = load_or_create_json(case_details_path)
         logging.info("All input files loaded successfully.")
@@ -182,12 +190,17 @@ def main():
         logging.error(f"Input CSV must contain '{debtor_col}' and '{creditor_col}' columns.")
         return
 
-    # --- Apply the processing logic to each row of the DataFrame ---
-    logging.info("Starting to apply processing logic to each row...")
-    df[output_col] = df.apply(
-        lambda row: process_inn_pair(row, search_data, case_details_data),
-        axis=1
+    # --- Process each unique INN pair once, then gather the results back to every row ---
+    # factorize numbers the pairs without building a key string per row; the per-pair results
+    # are then spread to all rows with one NumPy fancy-index instead of a per-row dict lookup.
+    pair_codes, unique_pairs = pd.factorize(pd.MultiIndex.from_arrays([df[debtor_col], df[creditor_col]]))
+    logging.info(f"Starting to process {len(unique_pairs)} unique INN pairs across {len(df)} rows...")
+
+    results = np.array(
+        [process_inn_pair(debtor_inn, creditor_inn, search_data, case_details_data) for debtor_inn, creditor_inn in unique_pairs],
+        dtype=object,
     )
+    df[output_col] = results[pair_codes]
     logging.info("Processing complete.")
 
     # --- Save the final result ---
@@ -54,15 +54,15 @@ def create_links_report(case_list_path, case_details_path, output_path):
 
             # --- 4. Verify that participants match the debtor and creditor ---
             participants = case_data.get("Participants", {})
-            plaintiffs = participants.get("Plaintiffs", [])
-            defendants = participants.get("Defendants", [])
+            plaintiffs = participants.get("Plaintiffs") or ()
+            defendants = participants.get("Defendants") or ()
 
-            # Extract INNs for easy lookup. Using a set for efficient checking.
-            plaintiff_inns = {p.get("INN") for p in plaintiffs if p.get("INN")}
-            defendant_inns = {d.get("INN") for d in defendants if d.get("INN")}
+            # any() stops at the first matching participant instead of building a set of INNs per case
+            creditor_is_plaintiff = bool(creditor_inn) and any(p.get("INN") == creditor_inn for p in plaintiffs)
+            debtor_is_defendant = bool(debtor_inn) and any(d.get("INN") == debtor_inn for d in defendants)
 
             # If the creditor and debtor from our key don't match the case participants, skip this case
-            if creditor_inn not in plaintiff_inns or debtor_inn not in defendant_inns:
+            if not (creditor_is_plaintiff and debtor_is_defendant):
                 continue
 
             # --- 5. Filter documents within the matched case ---
@@ -144,15 +144,16 @@ def debug_find_matching_participant_cases(case_list_path, case_details_path, out
             participants = case_data.get("Participants", {})
             
             # Get plaintiffs and defendants/respondents safely
-            plaintiffs = participants.get("Plaintiffs", [])
+            plaintiffs = participants.get("Plaintiffs") or ()
             # *** KEY CHANGE: Check for both "Defendants" and "Respondents" ***
-            defendants = participants.get("Defendants", []) or participants.get("Respondents", [])
-
-            # Ensure lists are not None before creating sets
-            plaintiff_inns = {p.get("INN") for p in plaintiffs if p and p.get("INN")}
-            defendant_inns = {d.get("INN") for d in defendants if d and d.get("INN")}
-
-            if creditor_inn in plaintiff_inns and debtor_inn in defendant_inns:
+            defendants = participants.get("Defendants") or participants.get("Respondents") or ()
+
+            # Participant entries can be null; any() exits on the first match without building sets
+            if (
+                creditor_inn and debtor_inn
+                and any(p and p.get("INN") == creditor_inn for p in plaintiffs)
+                and any(d and d.get("INN") == debtor_inn for d in defendants)
+            ):
                 found_matches_for_key.append(case_id)
         
         matching_cases[key] = ", ".join(found_matches_for_key)
@@ -51,7 +51,8 @@ def save_json(file_path: Path, data: Dict[str, Any]):
     """Saves a dictionary to a JSON file."""
     try:
         with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+            # Compact separators take the C encoder's fast path; these cache files are not edited by hand
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
     except IOError as e:
         logging.error(f"Could not save data to {file_path}: {e}")
 
@@ -65,7 +66,7 @@ def run_search_phase(token: str, input_csv_path: Path, search_results_path: Path
     logging.info("--- Starting Phase 1: Searching for Case IDs ---")
     
     try:
-        df = pd.read_csv(input_csv_path, dtype=str).fillna('')
+        df = pd.read_csv(input_csv_path, dtype=str, engine='c', memory_map=True, na_filter=False)
         logging.info(f"Loaded {len(df)} rows from {input_csv_path.name}.")
     except FileNotFoundError:
         logging.error(f"Input file not found at: {input_csv_path}")
@@ -78,10 +79,11 @@ def run_search_phase(token: str, input_csv_path: Path, search_results_path: Path
 
     search_results_data = load_or_create_json(search_results_path)
 
-    df['processing_key'] = df[debtor_col] + '|' + df[creditor_col]
-    unique_keys = df['processing_key'].unique()
-    
-    keys_to_process = [key for key in unique_keys if key not in search_results_data]
+    df['processing_key'] = df[debtor_col].str.cat(df[creditor_col], sep='|')
+    unique_keys = pd.Index(df['processing_key'].unique())
+
+    # Hash-based set difference in pandas instead of a Python membership test per key
+    keys_to_process = unique_keys.difference(pd.Index(list(search_results_data)), sort=False).tolist()
     logging.info(f"Found {len(unique_keys)} unique INN pairs. {len(keys_to_process)} pairs need processing.")
 
     for i, key in enumerate(keys_to_process):
@@ -1,6 +1,7 @@
 # File: api_processor.py
 
 import logging
+import re
 from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
@@ -16,6 +17,11 @@ RESULT_NO_SUITABLE_DOCS = "Подходящие документы не найд
 RESULT_API_ERROR = "API Error during processing"
 RESULT_API_RETRY_ERROR = "Сетевая ошибка, требуется повторная попытка"
 
+# --- Event classification rules ---
+DECISION_EVENT_TYPE = "Решение"
+MIXED_DECISION_EVENT_TYPE = "Решения и постановления"
+DECISION_CONTENT_RE = re.compile("решение", re.IGNORECASE)  # matched without lowercasing a copy of each ContentTypes entry
+
 # --- Type Hinting Aliases ---
 ApiParams = List[Tuple[str, str]]
 JsonDict = Dict[str, Any]
@@ -86,10 +92,11 @@ def filter_and_extract_documents(case_info_json: JsonDict, debtor_inn: str, cred
         return []
 
     participants = case_info_json.get("Result", {}).get("Participants", {})
-    plaintiff_inns = {p.get("INN") for p in participants.get("Plaintiffs", []) if p.get("INN")}
-    respondent_inns = {r.get("INN") for r in participants.get("Respondents", []) if r.get("INN")}
+    # any() stops at the first matching participant instead of building a set of INNs per role
+    is_creditor_plaintiff = bool(creditor_inn) and any(p.get("INN") == creditor_inn for p in participants.get("Plaintiffs") or ())
+    is_debtor_respondent = bool(debtor_inn) and any(r.get("INN") == debtor_inn for r in participants.get("Respondents") or ())
 
-    if not (creditor_inn in plaintiff_inns and debtor_inn in respondent_inns):
+    if not (is_creditor_plaintiff and is_debtor_respondent):
         case_id = case_info_json.get("Result", {}).get("CaseInfo", {}).get("CaseId", "N/A")
         logging.warning(f"INN role mismatch for CaseId {case_id}. Skipping.")
         return []
@@ -97,17 +104,21 @@ def filter_and_extract_documents(case_info_json: JsonDict, debtor_inn: str, cred
     documents: List[Document] = []
     for instance in case_info_json.get("Result", {}).get("CaseInstances", []):
         for event in instance.get("InstanceEvents", []):
+            # Unpack each event once; most have no file, so they are ruled out before classification
+            file_url = event.get("File")
+            doc_date = event.get("Date")
+            if not (file_url and doc_date):
+                continue
             event_type = event.get("EventTypeName", "")
-            content_types = event.get("ContentTypes", [])
-            
-            is_direct_decision = (event_type == "Решение")
+
+            is_direct_decision = (event_type == DECISION_EVENT_TYPE)
             is_filtered_decision = (
-                event_type == "Решения и постановления" and
-                any("решение" in str(ct).lower() for ct in content_types)
+                event_type == MIXED_DECISION_EVENT_TYPE and
+                any(isinstance(ct, str) and DECISION_CONTENT_RE.search(ct) for ct in event.get("ContentTypes") or ())
             )
 
-            if (is_direct_decision or is_filtered_decision) and event.get("File") and event.get("Date"):
-                doc = {"Date": event["Date"], "File": event["File"]}
+            if is_direct_decision or is_filtered_decision:
+                doc = {"Date": doc_date, "File": file_url}
                 documents.append(doc)
                 logging.info(f"  -> Found matching document: {doc['Date']}")
     return documents
@@ -118,9 +129,10 @@ def format_results(documents: List[Document]) -> str:
     if not documents:
         return RESULT_NO_SUITABLE_DOCS
     try:
-        sorted_docs = sorted(
-            documents, key=lambda x: pd.to_datetime(x['Date'], format='%d.%m.%Y', errors='coerce'), reverse=True
-        )
+        # Parse all dates in one vectorized call, then sort newest first; unparseable dates go last
+        dates = pd.Series(pd.to_datetime([doc['Date'] for doc in documents], format='%d.%m.%Y', errors='coerce', cache=True))
+        order = dates.sort_values(ascending=False, kind='stable', na_position='last').index
+        sorted_docs = [documents[i] for i in order]
     except (ValueError, KeyError):
         sorted_docs = documents
     return "\n".join([f"{i+1}. {doc['Date']}: {doc['File']}" for i, doc in enumerate(sorted_docs)])
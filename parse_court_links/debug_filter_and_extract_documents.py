@@ -1,5 +1,6 @@
 import json
 import logging
+import re
 from pathlib import Path
 from typing import List, Dict, Any
 
@@ -7,6 +8,9 @@ from typing import List, Dict, Any
 JsonDict = Dict[str, Any]
 Document = Dict[str, str]
 
+# Matched case-insensitively without lowercasing a copy of each ContentTypes entry
+DECISION_CONTENT_RE = re.compile("решение", re.IGNORECASE)
+
 def filter_and_extract_documents(case_info_json: JsonDict, debtor_inn: str, creditor_inn: str) -> List[Document]:
     """
     Filters events within a case to find specific court decisions, AFTER validating
@@ -18,16 +22,18 @@ def filter_and_extract_documents(case_info_json: JsonDict, debtor_inn: str, cred
 
     participants = case_info_json.get("Result", {}).get("Participants", {})
     
-    # Create sets of all plaintiff and respondent INNs found in the case
-    plaintiff_inns = {p.get("INN") for p in participants.get("Plaintiffs", []) if p.get("INN")}
-    respondent_inns = {r.get("INN") for r in participants.get("Respondents", []) if r.get("INN")}
+    plaintiffs = participants.get("Plaintiffs") or ()
+    respondents = participants.get("Respondents") or ()
 
-    # Check if our specific creditor is among the plaintiffs AND our debtor is among the respondents
-    is_creditor_plaintiff = creditor_inn in plaintiff_inns
-    is_debtor_respondent = debtor_inn in respondent_inns
+    # Check if our specific creditor is among the plaintiffs AND our debtor is among the respondents.
+    # any() stops at the first match; the full INN sets are only built for the mismatch warning.
+    is_creditor_plaintiff = bool(creditor_inn) and any(p.get("INN") == creditor_inn for p in plaintiffs)
+    is_debtor_respondent = bool(debtor_inn) and any(r.get("INN") == debtor_inn for r in respondents)
 
     if not (is_creditor_plaintiff and is_debtor_respondent):
         case_id = case_info_json.get("Result", {}).get("CaseInfo", {}).get("CaseId", "N/A")
+        plaintiff_inns = {p.get("INN") for p in plaintiffs if p.get("INN")}
+        respondent_inns = {r.get("INN") for r in respondents if r.get("INN")}
         logging.warning(
             f"INN role mismatch for CaseId {case_id}. "
             f"Expected Debtor(Respondent): {debtor_inn}, Creditor(Plaintiff): {creditor_inn}. "
@@ -42,15 +48,19 @@ def filter_and_extract_documents(case_info_json: JsonDict, debtor_inn: str, cred
     # We now correctly look inside the "Result" object to find "CaseInstances"
     for instance in case_info_json.get("Result", {}).get("CaseInstances", []):
         for event in instance.get("InstanceEvents", []):
+            # Unpack each event once; most have no file, so they are ruled out before classification
+            file_url = event.get("File")
+            doc_date = event.get("Date")
+            if not (file_url and doc_date):
+                continue
             event_type = event.get("EventTypeName", "")
-            content_types = event.get("ContentTypes", [])
-            
+
             is_decision_event = (event_type == "Решение") or \
                                 (event_type == "Решения и постановления" and any(
-                                    "решение" in str(ct).lower() for ct in content_types))
-            
-            if is_decision_event and event.get("File") and event.get("Date"):
-                documents.append({"Date": event["Date"], "File": event["File"]})
+                                    isinstance(ct, str) and DECISION_CONTENT_RE.search(ct) for ct in event.get("ContentTypes") or ()))
+
+            if is_decision_event:
+                documents.append({"Date": doc_date, "File": file_url})
     
     return documents
 
@@ -5,8 +5,27 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
-import requests
-from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; pandas' C parser is used without it
+    pa = pa_csv = None
+
+# Shared pieces come from the canonical script so fixes and optimizations land in one place
+from parse_court_links import (
+    Document,
+    JsonDict,
+    get_api_token,
+    load_cache,
+    make_api_request as fetch_api_json,
+    parse_document_date,
+)
 
 # --- Debug Configuration ---
 # Create a dedicated directory for logs if it doesn't exist
@@ -41,91 +60,77 @@ def log_json(title: str, data: Any):
 
 logging.info("Debugger script started. Detailed logs will be in parser_debug.log and parser_jsons.log")
 
-# --- Load Environment Variables ---
-load_dotenv()
-
 # --- Constants (from original script) ---
-BASE_URL = "https://api-cloud.ru/api/kad_arbitr.php"
-API_TIMEOUT = 120
 CACHE_FILE = "_cache_parse_court_links.json"
+PRETTY_CACHE = False  # Indent the cache snapshot for reading by hand; compact output is much faster to write
 RESULT_NO_CASES_FOUND = "нет результатов, нужна ручная проверка"
 RESULT_NO_SUITABLE_DOCS = "Подходящие документы не найдены"
 RESULT_API_ERROR = "API Error during processing"
 
-# --- Type Hinting Aliases (from original script) ---
+# --- Type Hinting Aliases (the API ones are shared with the original script) ---
+# A list rather than the shared dict alias: the debug search repeats the "participant" key
 ApiParams = List[Tuple[str, str]]
-JsonDict = Dict[str, Any]
-Document = Dict[str, str]
 CacheDict = Dict[str, str]
 
 # --- 1. Caching Functions (with added logging) ---
 
-def load_cache(cache_path: Path) -> CacheDict:
-    """Loads the API results cache from a JSON file."""
-    logging.debug(f"Attempting to load cache from: {cache_path}")
-    if not cache_path.exists():
-        logging.info("Cache file not found. Starting with an empty cache.")
-        return {}
-    try:
-        with open(cache_path, "r", encoding="utf-8") as f:
-            cache = json.load(f)
-            logging.info(f"Successfully loaded {len(cache)} items from cache.")
-            log_json(f"Loaded Cache from {cache_path}", cache)
-            return cache
-    except (json.JSONDecodeError, IOError) as e:
-        logging.warning(f"Could not read or parse cache file: {e}. Starting fresh.")
-        return {}
-
-def save_cache(cache_path: Path, cache: CacheDict):
-    """Saves the cache to a JSON file."""
+def save_cache(cache_path: Path, cache: CacheDict) -> bool:
+    """Saves the cache to a JSON file, replacing the old snapshot atomically."""
     logging.debug(f"Saving cache with {len(cache)} items to {cache_path}")
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
     try:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(cache, f, ensure_ascii=False, indent=4)
+        if orjson is not None:
+            # orjson writes UTF-8 bytes directly and is several times faster on the Cyrillic-heavy cache
+            option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if PRETTY_CACHE else 0)
+            tmp_path.write_bytes(orjson.dumps(cache, option=option))
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                if PRETTY_CACHE:
+                    json.dump(cache, f, ensure_ascii=False, indent=4)
+                else:
+                    json.dump(cache, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, cache_path)
         log_json(f"Saved Cache to {cache_path}", cache)
+        return True
     except IOError as e:
         logging.error(f"Could not save cache to {cache_path}: {e}")
+        return False
+
+def replay_cache_log(log_path: Path, cache: CacheDict) -> int:
+    """Applies the entries of an append-only JSONL cache log to `cache`. Returns how many were applied."""
+    if not log_path.exists():
+        return 0
+    applied = 0
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                cache.update(json.loads(line))
+                applied += 1
+            except json.JSONDecodeError:
+                # Only the last line can be cut short, by a crash mid-write
+                logging.warning(f"Skipping unreadable line in cache log {log_path}.")
+    logging.info(f"Replayed {applied} entries from cache log {log_path}.")
+    return applied
+
+def append_cache_entry(log_file, key: str, value: str):
+    """Appends one cache entry to the open JSONL cache log, so each new result costs O(1) bytes written."""
+    log_file.write(json.dumps({key: value}, ensure_ascii=False) + "\n")
+    log_file.flush()
 
 # --- 2. Core API Interaction Functions (with added logging) ---
 
-def get_api_token() -> Optional[str]:
-    """Retrieves the API token from environment variables."""
-    logging.debug("Attempting to retrieve API token from .env file.")
-    token = os.getenv("api_cloud")
-    if not token:
-        logging.error("CRITICAL: 'api_cloud' token not found in .env file. Script cannot proceed.")
-    else:
-        logging.debug("API token found.")
-    return token
-
 def make_api_request(params: ApiParams) -> Optional[JsonDict]:
-    """Makes a GET request and logs the full JSON response."""
-    logging.debug(f"Making API request to {BASE_URL} with params: {params}")
-    try:
-        response = requests.get(BASE_URL, params=params, timeout=API_TIMEOUT)
-        response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-        
-        json_response = response.json()
-        log_json(f"API Response for type={params[1][1]}", json_response)
-
-        if json_response.get("status") != 200:
-            logging.warning(f"API returned non-200 status. Error: {json_response.get('errormsg')}")
-            return None
-        
-        logging.debug("API request successful and status is 200.")
-        return json_response
-        
-    except requests.exceptions.Timeout:
-        logging.error(f"API request timed out after {API_TIMEOUT} seconds.")
-        return None
-    except requests.exceptions.RequestException as e:
-        logging.error(f"An error occurred during API request: {e}")
-        return None
-    except json.JSONDecodeError:
-        logging.error("Failed to decode JSON from API response.")
-        logging.debug(f"Raw response text: {response.text}")
+    """Makes a GET request through the shared client and logs the full JSON response."""
+    logging.debug(f"Making API request with params: {params}")
+    json_response, is_retryable = fetch_api_json(params)
+    if json_response is None:
+        logging.warning(f"API request failed (retryable: {is_retryable}).")
         return None
 
+    log_json(f"API Response for type={params[1][1]}", json_response)
+    logging.debug("API request successful and status is 200.")
+    return json_response
+
 def search_cases(token: str, debtor_inn: str, creditor_inn: str) -> Optional[List[str]]:
     """Performs a 'search' API call and logs the process."""
     logging.debug(f"Searching for cases with Debtor INN: {debtor_inn}, Creditor INN: {creditor_inn}")
@@ -200,9 +205,7 @@ def format_results(documents: List[Document]) -> str:
     logging.debug(f"Formatting {len(documents)} documents.")
     try:
         # Sort by date, newest first
-        sorted_docs = sorted(
-            documents, key=lambda x: pd.to_datetime(x['Date'], format='%d.%m.%Y'), reverse=True
-        )
+        sorted_docs = sorted(documents, key=lambda x: parse_document_date(x['Date']), reverse=True)
         logging.debug("Successfully sorted documents by date.")
     except (ValueError, KeyError) as e:
         logging.warning(f"Could not sort documents by date due to error: {e}. Using original order.")
@@ -263,7 +266,21 @@ def main():
         return
 
     try:
-        df = pd.read_csv(input_file, dtype=str).fillna('')
+        # Parse only the columns the debug run uses, as text with '' for empty cells
+        used_cols = [debtor_col, creditor_col, 'number']
+        if pa_csv is not None:
+            # Types are pinned to string: pyarrow would otherwise read INNs as numbers and drop leading zeros
+            convert_options = pa_csv.ConvertOptions(
+                include_columns=used_cols, column_types={col: pa.string() for col in used_cols},
+                strings_can_be_null=False, null_values=[],
+            )
+            # Quoted cells may span lines in any column, including the ones left out
+            parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+            df = pa_csv.read_csv(input_file, parse_options=parse_options, convert_options=convert_options).to_pandas()
+        else:
+            df = pd.read_csv(
+                input_file, dtype=str, engine='c', memory_map=True, na_filter=False, usecols=used_cols,
+            )
         df = df[[debtor_col, creditor_col, 'number']]
         df = df.head(6)
         logging.info(f"Loaded {len(df)} rows from {input_file}.")
@@ -273,28 +290,37 @@ def main():
             return
 
         cache = load_cache(cache_file)
+        cache_log_file = cache_file.with_suffix(".jsonl")
+        replayed = replay_cache_log(cache_log_file, cache)
+        log_json(f"Loaded Cache from {cache_file}", cache)
 
-        df['cache_key'] = df[debtor_col] + '|' + df[creditor_col]
-        unique_keys = df['cache_key'].unique()
-        logging.info(f"Found {len(unique_keys)} unique INN pairs to process: {unique_keys}")
+        df['cache_key'] = df[debtor_col].str.cat(df[creditor_col], sep='|')
+        unique_keys = pd.Index(df['cache_key'].unique())
+        logging.info(f"Found {len(unique_keys)} unique INN pairs to process: {unique_keys.tolist()}")
 
-        keys_to_fetch = [key for key in unique_keys if key not in cache]
+        # Hash-based set difference in pandas instead of a Python membership test per key
+        keys_to_fetch = unique_keys.difference(pd.Index(list(cache)), sort=False).tolist()
         logging.info(f"{len(keys_to_fetch)} pairs are new and will be fetched from the API: {keys_to_fetch}")
         
         if not keys_to_fetch:
             logging.info("All required data is already in the cache. No API calls needed.")
 
-        for i, key in enumerate(keys_to_fetch):
-            logging.info(f"--- Fetching API data for new pair {i+1}/{len(keys_to_fetch)}: {key} ---")
-            debtor_inn, creditor_inn = key.split('|')
-            
-            result = process_inn_pair(token, debtor_inn, creditor_inn)
-            
-            cache[key] = result
-            save_cache(cache_file, cache)
+        # New results go to the JSONL log as they arrive; the JSON snapshot is rewritten once at the end
+        with open(cache_log_file, "a", encoding="utf-8") as cache_log:
+            for i, key in enumerate(keys_to_fetch):
+                logging.info(f"--- Fetching API data for new pair {i+1}/{len(keys_to_fetch)}: {key} ---")
+                debtor_inn, creditor_inn = key.split('|')
+
+                result = process_inn_pair(token, debtor_inn, creditor_inn)
+
+                cache[key] = result
+                append_cache_entry(cache_log, key, result)
+
+        if (keys_to_fetch or replayed) and save_cache(cache_file, cache):
+            cache_log_file.unlink()
         
         logging.info("Mapping cached results back to the DataFrame.")
-        df[output_col] = df['cache_key'].map(cache)
+        df[output_col] = df['cache_key'].map(cache).astype('string')
         
         df.drop(columns=['cache_key'], inplace=True)
         df.to_csv(output_file, index=False, encoding='utf-8-sig')
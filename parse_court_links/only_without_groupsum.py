@@ -2,7 +2,7 @@ from pathlib import Path
 import pandas as pd
 
 def filter_and_sort_by_summa(input_file, output_file):
-    df = pd.read_csv(input_file, dtype=str).fillna('')
+    df = pd.read_csv(input_file, dtype=str, engine='c', memory_map=True, na_filter=False)
     # Keep only rows where 'group_summa' is empty or missing
     filtered_df = df[(df['group_summa'] == '') | (df['group_summa'].isna())]
     # Convert 'summa' to numeric for sorting
@@ -1,23 +1,61 @@
 # File: court_links.py
 
+import csv
 import json
 import logging
 import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Set
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Set
 
-import pandas as pd
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from rate_limit import API_RATE_LIMITER
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to pandas' bundled ujson for parsing
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; legacy JSON caches are then parsed in one go
+    ijson = None
+
+ujson_loads = json.loads
+if orjson is None:  # importing pandas is slow, so only pay for its ujson binding when it is needed
+    try:
+        from pandas.io.json import ujson_loads
+    except ImportError:  # the ujson binding is not public API and may move between pandas releases
+        pass
 
 # --- Configuration ---
+log = logging.getLogger(__name__)
 # Load environment variables from .env file
 load_dotenv()
 
 # --- Constants ---
+LEGACY_IMPORT_BATCH = 1000  # Entries written per transaction when importing a legacy JSON cache
+PAIR_KEY_COLUMNS = ("debtor_inn", "creditor_inn")  # Key columns of caches keyed by INN pair
+CASE_INFO_MAX_AGE = 7 * 24 * 3600  # Seconds a cached caseInfo response is reused before it is fetched again
 BASE_URL = "https://api-cloud.ru/api/kad_arbitr.php"
 API_TIMEOUT = 120  # Seconds, as recommended by the API documentation
 LOW_BALANCE_THRESHOLD = 100.0 # Stop processing if balance is at or below this value
+API_MAX_ATTEMPTS = 5  # Attempts per request when the API answers 429 or 5xx
+API_BACKOFF_BASE = 1.0  # Seconds; doubled after each throttled attempt
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+RESULT_QUEUE_SIZE = 100  # Finished pairs waiting for the cache writer before the main loop blocks
+PAIR_WORKERS = 10  # INN pairs processed concurrently
+CASE_INFO_WORKERS = 8  # caseInfo requests in flight per INN pair; API_RATE_LIMITER still caps the request rate
 
 # Result messages based on your instructions
 RESULT_NO_CASES_FOUND = "Нет результатов, нужна ручная проверка"
@@ -25,6 +63,15 @@ RESULT_NO_SUITABLE_DOCS = "Документы с решениями не най
 RESULT_API_ERROR = "API Error during processing"
 RESULT_API_RETRY_ERROR = "Сетевая ошибка, требуется повторная попытка"
 
+# Event classification rules for filter_and_extract_documents
+DECISION_EVENT_TYPES = frozenset({"Решение", "Решения"})
+MIXED_DECISION_EVENT_TYPE = "Решения и постановления"
+# Case-insensitive scans of ContentTypes entries, without lowercasing a copy of each string
+DECISION_CONTENT_RE = re.compile("решени", re.IGNORECASE)
+OPERATIVE_PART_RE = re.compile("резолют", re.IGNORECASE)
+# Substring shared by every accepted event type, as it appears in the UTF-8 JSON encoding
+DECISION_MARKER = "Решени".encode("utf-8")
+
 
 # --- Custom Exception for Balance Control ---
 class LowBalanceError(Exception):
@@ -32,8 +79,21 @@ class LowBalanceError(Exception):
     pass
 
 
+# One keep-alive session for all calls, so the TCP/TLS handshake with the API host happens once per
+# pooled connection instead of once per request. The pool fits every worker thread that can be in flight.
+# Only connection failures are retried here: HTTP statuses are handled by get_with_backoff, and read
+# timeouts are not resent because the API bills the request (read=False, unlike read=0, re-raises the
+# timeout itself rather than wrapping it in a MaxRetryError, so the log names the read timeout).
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=PAIR_WORKERS * CASE_INFO_WORKERS,
+    max_retries=Retry(total=3, read=False, backoff_factor=0.5),
+))
+
+
 # --- Type Hinting Aliases ---
-ApiParams = List[Tuple[str, str]]
+ApiParams = Dict[str, str]
 JsonDict = Dict[str, Any]
 Document = Dict[str, str]
 CacheDict = Dict[str, Any]
@@ -41,28 +101,150 @@ CacheDict = Dict[str, Any]
 
 # --- 1. Caching Functions ---
 
+def json_loads(data: bytes) -> Any:
+    """Parses JSON bytes with orjson when installed, otherwise with pandas' ujson."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return ujson_loads(data)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Serializes an object to compact UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class SqliteCache(dict):
+    """
+    An in-memory cache dict persisted to a SQLite table.
+
+    Keys assigned since the last flush() are tracked, so saving costs one
+    upsert per changed entry instead of rewriting the whole cache. With more than
+    one key column, keys are tuples stored one element per column. Assignments and
+    flushes may come from different threads.
+    """
+
+    def __init__(self, db_path: Path, key_columns: Tuple[str, ...] = ("key",), max_age: Optional[float] = None):
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._table = "cache" if len(key_columns) == 1 else "pair_cache"
+        self._key_columns = key_columns
+        columns = ", ".join(f"{column} TEXT NOT NULL" for column in key_columns)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ({columns}, value BLOB NOT NULL, "
+            f"updated_at REAL NOT NULL DEFAULT 0, PRIMARY KEY ({', '.join(key_columns)}))"
+        )
+        self.stored_rows = self._conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+        # Entries older than max_age seconds are left out, so they are fetched again and overwritten
+        cutoff = time.time() - max_age if max_age is not None else 0
+        rows = self._conn.execute(
+            f"SELECT {', '.join(key_columns)}, value FROM {self._table} WHERE updated_at >= ?", (cutoff,)
+        )
+        if len(key_columns) == 1:
+            super().__init__((key, json_loads(value)) for key, value in rows)
+        else:
+            super().__init__((tuple(row[:-1]), json_loads(row[-1])) for row in rows)
+        self._dirty: Set[Any] = set()
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key: Any, value: Any):
+        with self._lock:
+            super().__setitem__(key, value)
+            self._dirty.add(key)
+
+    def flush(self):
+        """Writes every entry assigned since the last flush in a single transaction."""
+        with self._lock:
+            if not self._dirty:
+                return
+            keys, self._dirty = self._dirty, set()
+            now = time.time()
+            rows = []
+            for key in keys:
+                try:
+                    value = json_dumps(self[key])
+                except (TypeError, ValueError) as e:
+                    # One unencodable value must not cost the rest of the batch
+                    log.error("Cache entry %s cannot be encoded as JSON and is not saved: %s", key, e)
+                    continue
+                rows.append((key, value, now) if len(self._key_columns) == 1 else (*key, value, now))
+        placeholders = ", ".join("?" * (len(self._key_columns) + 2))
+        try:
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self._table} ({', '.join(self._key_columns)}, value, updated_at) "
+                    f"VALUES ({placeholders})",
+                    rows,
+                )
+        except sqlite3.Error:
+            with self._lock:
+                self._dirty |= keys  # keep them for the next flush
+            raise
+
+    def close(self):
+        """Flushes pending entries and closes the database connection."""
+        self.flush()
+        self._conn.close()
+
+
 def load_cache(cache_path: Path) -> CacheDict:
     """Loads the API results cache from a JSON file."""
     if not cache_path.exists():
-        logging.info(f"Cache file {cache_path.name} not found. Starting with an empty cache.")
+        log.info("Cache file %s not found. Starting with an empty cache.", cache_path.name)
         return {}
     try:
-        with open(cache_path, "r", encoding="utf-8") as f:
-            cache = json.load(f)
-            logging.info(f"Successfully loaded {len(cache)} items from {cache_path.name}.")
+        with open(cache_path, "rb") as f:
+            cache = json_loads(f.read())
+            log.info("Successfully loaded %s items from %s.", len(cache), cache_path.name)
             return cache
-    except (json.JSONDecodeError, IOError) as e:
-        logging.warning(f"Could not read or parse cache file {cache_path.name}: {e}. Starting fresh.")
+    except (ValueError, IOError) as e:  # JSON decode errors of all parsers subclass ValueError
+        log.warning("Could not read or parse cache file %s: %s. Starting fresh.", cache_path.name, e)
         return {}
 
 
-def save_cache(cache_path: Path, cache: CacheDict):
-    """Saves the cache to a JSON file."""
+def iter_json_cache(cache_path: Path) -> Iterator[Tuple[str, Any]]:
+    """
+    Yields the key/value pairs of a JSON cache file. With ijson installed the file
+    is streamed, so a large cache is never held as a parsed tree and a copy at once.
+    """
+    if ijson is None:
+        yield from load_cache(cache_path).items()
+        return
     try:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(cache, f, ensure_ascii=False, indent=4)
-    except IOError as e:
-        logging.error(f"Could not save cache to {cache_path}: {e}")
+        with open(cache_path, "rb") as f:
+            yield from ijson.kvitems(f, "", use_float=True)
+    except (ijson.JSONError, IOError) as e:
+        log.warning("Could not fully read cache file %s: %s. Keeping the entries read so far.", cache_path.name, e)
+
+
+def open_cache(cache_path: Path, pair_keys: bool = False, max_age: Optional[float] = None) -> SqliteCache:
+    """
+    Opens the SQLite cache stored next to `cache_path` with a .sqlite suffix.
+    With `pair_keys`, entries are keyed by (debtor_inn, creditor_inn) tuples.
+    With `max_age`, entries older than that many seconds are treated as missing.
+    A legacy JSON cache at `cache_path` is imported when the database is still empty;
+    its "debtor|creditor" string keys are split into tuples for pair caches.
+    """
+    db_path = cache_path.with_suffix(".sqlite")
+    cache = SqliteCache(db_path, PAIR_KEY_COLUMNS if pair_keys else ("key",), max_age)
+    if cache.stored_rows:
+        expired = cache.stored_rows - len(cache)
+        log.info("Successfully loaded %s items from %s (%s expired).", len(cache), db_path.name, expired)
+    elif cache_path.exists():
+        for i, (key, value) in enumerate(iter_json_cache(cache_path), start=1):
+            if pair_keys:
+                key = tuple(key.split("|", 1))
+                if len(key) != 2:
+                    log.warning("Skipping legacy cache entry with invalid key format: %s", key[0])
+                    continue
+            cache[key] = value
+            if i % LEGACY_IMPORT_BATCH == 0:
+                cache.flush()
+        cache.flush()
+        log.info("Imported %s items from legacy cache %s into %s.", len(cache), cache_path.name, db_path.name)
+    return cache
 
 
 # --- 2. Core API Interaction Functions ---
@@ -71,41 +253,66 @@ def get_api_token() -> Optional[str]:
     """Retrieves the API token from environment variables."""
     token = os.getenv("api_cloud")
     if not token:
-        logging.error("FATAL: 'api_cloud' token not found in .env file. Please create it.")
+        log.error("FATAL: 'api_cloud' token not found in .env file. Please create it.")
     return token
 
 
+def get_with_backoff(params: ApiParams) -> requests.Response:
+    """
+    Sends a rate-limited GET request, backing off exponentially while the API
+    answers 429 or 5xx. A Retry-After header, when sent, sets the minimum wait.
+    Rejected attempts take a token too, so retries count against the request rate.
+    The last response is returned once attempts run out.
+    """
+    for attempt in range(1, API_MAX_ATTEMPTS + 1):
+        API_RATE_LIMITER.acquire()
+        response = HTTP_SESSION.get(BASE_URL, params=params, timeout=API_TIMEOUT)
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == API_MAX_ATTEMPTS:
+            return response
+        delay = API_BACKOFF_BASE * 2 ** (attempt - 1)
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        log.warning("API returned HTTP %s. Retrying in %.0fs (attempt %s/%s).", response.status_code, delay, attempt, API_MAX_ATTEMPTS)
+        time.sleep(delay)
+    return response
+
+
 def make_api_request(params: ApiParams) -> Tuple[Optional[JsonDict], bool]:
     """
     Makes a GET request to the API Cloud endpoint.
     Returns a tuple: (response_json, is_retryable_error)
     """
     try:
-        response = requests.get(BASE_URL, params=params, timeout=API_TIMEOUT)
+        response = get_with_backoff(params)
         response.raise_for_status()  # Raises HTTPError for bad responses (4xx or 5xx)
-        json_response = response.json()
+        json_response = json_loads(response.content)
 
         # --- Balance Check START ---
         if "inquiry" in json_response and "balance" in json_response["inquiry"]:
             try:
                 current_balance = float(json_response["inquiry"]["balance"])
-                logging.info(f"API Balance updated: {current_balance:.2f}")
+                log.info("API Balance updated: %.2f", current_balance)
                 if current_balance <= LOW_BALANCE_THRESHOLD:
-                    logging.warning(f"API balance is {current_balance:.2f}, which is at or below the threshold of {LOW_BALANCE_THRESHOLD}. Stopping.")
+                    log.warning("API balance is %.2f, which is at or below the threshold of %s. Stopping.", current_balance, LOW_BALANCE_THRESHOLD)
                     raise LowBalanceError("API balance is too low.")
             except (ValueError, TypeError):
-                logging.warning("Could not parse balance from API response.")
+                log.warning("Could not parse balance from API response.")
         # --- Balance Check END ---
 
         if json_response.get("status") != 200:
             error_msg = json_response.get('errormsg', 'Unknown API error')
-            logging.warning(f"API returned non-200 status: {error_msg}")
+            log.warning("API returned non-200 status: %s", error_msg)
             return None, False
 
         return json_response, False
 
     except requests.exceptions.RequestException as e:
-        logging.error(f"API request failed with a network error: {e}")
+        log.error("API request failed with a network error: %s", e)
+        return None, True
+    except ValueError as e:
+        # Raised by every JSON parser we use on a malformed body; a truncated body is worth retrying.
+        log.error("API returned a response that is not valid JSON: %s", e)
         return None, True
 
 def search_cases(
@@ -115,7 +322,7 @@ def search_cases(
     Performs a 'search' API call, using a stateful cache to allow resuming.
     Returns a tuple: (list_of_case_ids, is_retryable_error, page_limit_warning_message)
     """
-    inn_pair_key = f"{debtor_inn}|{creditor_inn}"
+    inn_pair_key = (debtor_inn, creditor_inn)
     
     # --- Cache Handling Logic ---
     cached_data = search_cache.get(inn_pair_key)
@@ -129,25 +336,24 @@ def search_cases(
         # Handle new dictionary-based cache format
         if isinstance(cached_data, dict) and 'is_complete' in cached_data:
             if cached_data['is_complete']:
-                logging.info(f"Cache HIT (Complete) for search: {inn_pair_key}. Using cached data.")
+                log.info("Cache HIT (Complete) for search: %s. Using cached data.", inn_pair_key)
                 return cached_data['case_ids'], False, None
             else:
-                logging.info(f"Cache HIT (Partial) for search: {inn_pair_key}. Resuming.")
+                log.info("Cache HIT (Partial) for search: %s. Resuming.", inn_pair_key)
                 all_case_ids = set(cached_data.get('case_ids', []))
                 page_num = cached_data.get('last_page_fetched', 0) + 1
                 total_pages = cached_data.get('total_pages', 1)
         # Handle old list-based cache format (for backward compatibility)
         elif isinstance(cached_data, list):
-            logging.info(f"Cache HIT (Legacy format) for search: {inn_pair_key}. Treating as complete.")
+            log.info("Cache HIT (Legacy format) for search: %s. Treating as complete.", inn_pair_key)
             return cached_data, False, None
     else:
-        logging.info(f"Cache MISS for search: {inn_pair_key}. Starting new search.")
+        log.info("Cache MISS for search: %s. Starting new search.", inn_pair_key)
 
     # --- API Call Loop ---
     multi_participant_str = f"{creditor_inn}:0,{debtor_inn}:1"
-    base_params: ApiParams = [
-        ("token", token), ("type", "search"), ("CaseType", "G"), ("participant", multi_participant_str),
-    ]
+    # Built once per pair; each page only adds its "page" entry
+    base_params: ApiParams = {"token": token, "type": "search", "CaseType": "G", "participant": multi_participant_str}
     page_limit_warning: Optional[str] = None
     
     # --- CHANGE 1: Add a flag to track if we broke because results ended ---
@@ -155,8 +361,8 @@ def search_cases(
     
     # The loop now starts from where it left off (or page 1)
     while page_num <= total_pages and page_num <= max_pages_to_fetch:
-        logging.info(f"  -> Fetching page {page_num}/{total_pages} (limit: {max_pages_to_fetch})...")
-        paged_params = base_params + [("page", str(page_num))]
+        log.info("  -> Fetching page %s/%s (limit: %s)...", page_num, total_pages, max_pages_to_fetch)
+        paged_params = {**base_params, "page": str(page_num)}
         response, is_retryable = make_api_request(paged_params)
 
         if is_retryable:
@@ -172,10 +378,10 @@ def search_cases(
                 # Update total_pages if it has changed or is new
                 current_total_pages = int(response.get("PagesCount", 1))
                 if current_total_pages != total_pages:
-                    logging.info(f"Total pages for {inn_pair_key} is {current_total_pages}.")
+                    log.info("Total pages for %s is %s.", inn_pair_key, current_total_pages)
                     total_pages = current_total_pages
             except (ValueError, TypeError):
-                logging.warning(f"Could not parse 'PagesCount'. Pagination may be incomplete.")
+                log.warning("Could not parse 'PagesCount'. Pagination may be incomplete.")
                 # --- CHANGE 2: Set the flag and break if pagination info is bad ---
                 did_break_early = True
                 break
@@ -193,7 +399,7 @@ def search_cases(
     is_now_complete = (last_page_processed >= total_pages) or did_break_early
     
     if not all_case_ids and is_now_complete:
-        logging.info("API search returned no matching cases. Caching as complete.")
+        log.info("API search returned no matching cases. Caching as complete.")
         # Cache the empty but complete result
         search_cache[inn_pair_key] = {'case_ids': [], 'last_page_fetched': last_page_processed, 'total_pages': total_pages, 'is_complete': True}
         return [], False, None
@@ -201,10 +407,10 @@ def search_cases(
     # Generate warning if we stopped due to the fetch limit but there were more pages
     if not is_now_complete and total_pages > max_pages_to_fetch:
         page_limit_warning = f"собрано только {max_pages_to_fetch}/{total_pages} страниц"
-        logging.warning(f"Page limit hit for {inn_pair_key}: Fetched up to page {max_pages_to_fetch} of {total_pages}.")
+        log.warning("Page limit hit for %s: Fetched up to page %s of %s.", inn_pair_key, max_pages_to_fetch, total_pages)
 
     sorted_case_ids = sorted(list(all_case_ids))
-    logging.info(f"Finished search. Found {len(sorted_case_ids)} unique case(s).")
+    log.info("Finished search. Found %s unique case(s).", len(sorted_case_ids))
 
     # ALWAYS update the cache with the latest state (partial or complete)
     search_cache[inn_pair_key] = {
@@ -213,7 +419,7 @@ def search_cases(
         'total_pages': total_pages,
         'is_complete': is_now_complete
     }
-    logging.info(f"Search state for {inn_pair_key} saved to cache (Complete: {is_now_complete}).")
+    log.info("Search state for %s saved to cache (Complete: %s).", inn_pair_key, is_now_complete)
 
     return sorted_case_ids, False, page_limit_warning
 
@@ -223,11 +429,11 @@ def get_case_info(token: str, case_id: str, case_info_cache: CacheDict) -> Tuple
     Returns a tuple: (case_info_json, is_retryable_error)
     """
     if case_id in case_info_cache:
-        logging.info(f"Cache HIT for caseInfo: {case_id}. Using cached data.")
+        log.info("Cache HIT for caseInfo: %s. Using cached data.", case_id)
         return case_info_cache[case_id], False
 
-    logging.info(f"Cache MISS for caseInfo: {case_id}. Calling API.")
-    params: ApiParams = [("token", token), ("type", "caseInfo"), ("CaseId", case_id)]
+    log.info("Cache MISS for caseInfo: %s. Calling API.", case_id)
+    params: ApiParams = {"token": token, "type": "caseInfo", "CaseId": case_id}
 
     response, is_retryable = make_api_request(params)
     if not is_retryable and response:
@@ -238,52 +444,68 @@ def get_case_info(token: str, case_id: str, case_info_cache: CacheDict) -> Tuple
 
 # --- 3. Data Processing and Analysis Functions ---
 
+def is_decision_content_type(content_type: Any) -> bool:
+    """True for a ContentTypes entry describing a full decision (not just its operative part)."""
+    if not isinstance(content_type, str):
+        return False
+    return DECISION_CONTENT_RE.search(content_type) is not None and OPERATIVE_PART_RE.search(content_type) is None
+
+
 def filter_and_extract_documents(case_info_json: JsonDict) -> List[Document]:
     """
     Filters events within a case to find specific court decisions based on your rules.
     """
     if not case_info_json or not case_info_json.get("Result"):
-        logging.warning("Case info JSON is empty or malformed. Skipping.")
+        log.warning("Case info JSON is empty or malformed. Skipping.")
         return []
 
     documents: List[Document] = []
     case_instances = case_info_json.get("Result", {}).get("CaseInstances", [])
 
+    # A single C-level substring scan rules out cases without any decision event,
+    # which are the majority, before walking their events in Python.
+    if DECISION_MARKER not in json_dumps(case_instances):
+        return documents
+
     for instance in case_instances:
         for event in instance.get("InstanceEvents", []):
+            # Most events carry no file, so rule them out before classifying the event type
+            if not (event.get("File") and event.get("Date")):
+                continue
             event_type = event.get("EventTypeName", "")
-            content_types = event.get("ContentTypes", [])
 
             # Rule 1: EventTypeName is "Решение" or "Решения"
-            is_direct_decision = event_type in ("Решение", "Решения")
+            is_decision = event_type in DECISION_EVENT_TYPES
 
             # Rule 2: EventTypeName is "Решения и постановления" AND ContentTypes contains "решение"
-            is_filtered_decision = (
-                event_type == "Решения и постановления"
-                and any(
-                    "решени" in str(ct).lower() and "резолют" not in str(ct).lower()
-                    for ct in content_types
-                )
-            )
+            if not is_decision and event_type == MIXED_DECISION_EVENT_TYPE:
+                is_decision = any(is_decision_content_type(ct) for ct in event.get("ContentTypes") or ())
 
-            if (is_direct_decision or is_filtered_decision) and event.get("File") and event.get("Date"):
-                doc = {"Date": event["Date"], "File": event["File"]}
-                documents.append(doc)
-                logging.info(f"  -> Found matching document: {doc['Date']}")
+            if is_decision:
+                documents.append({"Date": event["Date"], "File": event["File"]})
 
+    # One summary line per case instead of a formatted record per matching event
+    if documents and log.isEnabledFor(logging.INFO):
+        log.info("  -> Found %s matching document(s): %s", len(documents), ", ".join(doc["Date"] for doc in documents))
     return documents
 
+def parse_document_date(date_str: str) -> datetime:
+    """Parses a 'DD.MM.YYYY' document date. Unparseable dates sort as the oldest."""
+    try:
+        return datetime.strptime(date_str, "%d.%m.%Y")
+    except (ValueError, TypeError):
+        return datetime.min
+
+
 def format_results(documents: List[Document]) -> str:
     """Formats the list of found documents into a sorted, string."""
     if not documents:
         return RESULT_NO_SUITABLE_DOCS
     try:
-        # Sort by date, newest first
-        sorted_docs = sorted(
-            documents, key=lambda x: pd.to_datetime(x['Date'], format='%d.%m.%Y', errors='coerce'), reverse=True
-        )
+        # Sort by date, newest first. strptime is far cheaper than a pd.to_datetime call per document.
+        sorted_docs = sorted(documents, key=lambda x: parse_document_date(x['Date']), reverse=True)
     except (ValueError, KeyError) as e:
-        logging.warning(f"Could not sort documents by date due to format error: {e}. Using original order.")
+        log.warning("Could not sort documents by date due to format error: %s. Using original order.", e)
         sorted_docs = documents
 
     return "\n".join([f"{doc['Date']}: {doc['File']}" for doc in sorted_docs])
@@ -302,19 +524,22 @@ def process_inn_pair(
     if not case_ids:
         return RESULT_NO_CASES_FOUND
 
-    all_documents: List[Document] = []
-    for case_id in case_ids:
-        case_info, is_retryable = get_case_info(token, case_id, case_info_cache)
+    # The caseInfo calls of a pair are independent, so overlap their network latency.
+    # map() keeps the case_ids order and re-raises LowBalanceError from any worker.
+    with ThreadPoolExecutor(max_workers=min(CASE_INFO_WORKERS, len(case_ids))) as executor:
+        case_infos = list(executor.map(lambda case_id: get_case_info(token, case_id, case_info_cache), case_ids))
 
+    all_documents: List[Document] = []
+    for case_id, (case_info, is_retryable) in zip(case_ids, case_infos):
         if is_retryable:
-            logging.warning(f"Network error while fetching CaseId {case_id}. Marking entire pair for retry.")
+            log.warning("Network error while fetching CaseId %s. Marking entire pair for retry.", case_id)
             return RESULT_API_RETRY_ERROR
 
         if case_info:
             documents = filter_and_extract_documents(case_info)
             all_documents.extend(documents)
         else:
-            logging.warning(f"Failed to retrieve or parse caseInfo for CaseId: {case_id} (non-retryable error).")
+            log.warning("Failed to retrieve or parse caseInfo for CaseId: %s (non-retryable error).", case_id)
 
     final_result_string = format_results(all_documents)
 
@@ -326,6 +551,38 @@ def process_inn_pair(
 
 # --- 4. Main Execution Block ---
 
+def cache_writer(
+    result_queue: "queue.Queue[Optional[Tuple[Tuple[str, str], str]]]", results_cache: SqliteCache, caches: Tuple[SqliteCache, ...]
+):
+    """
+    Consumes (key, result) items until a None sentinel arrives. Every item already
+    queued is taken as one batch, stored in the results cache, and all caches are
+    flushed together, so a slow disk costs one transaction per batch, not per pair.
+    """
+    stop = False
+    while not stop:
+        batch = [result_queue.get()]
+        while not result_queue.empty():
+            batch.append(result_queue.get_nowait())
+        stop = any(item is None for item in batch)
+        try:
+            for item in batch:
+                if item is not None:
+                    key, result = item
+                    results_cache[key] = result
+            for cache in caches:
+                cache.flush()
+        except sqlite3.Error as e:
+            log.error("Could not write cache batch: %s. Entries will be retried on the next flush.", e)
+        except Exception:
+            # The thread must outlive a bad batch: if it died, the bounded queue would fill and block the main loop for good
+            log.exception("Unexpected error while writing a cache batch. The writer keeps running.")
+
+def read_inn_pair(row: Dict[str, Optional[str]], debtor_col: str, creditor_col: str) -> Tuple[str, str]:
+    """Returns the stripped (debtor_inn, creditor_inn) key of a CSV row; missing cells read as ''."""
+    return (row[debtor_col] or '').strip(), (row[creditor_col] or '').strip()
+
+
 def main():
     """Main function to run the entire script."""
     script_dir = Path(__file__).parent
@@ -357,7 +614,7 @@ def main():
             logging.StreamHandler()
         ]
     )
-    logging.info("--- Script Execution Started ---")
+    log.info("--- Script Execution Started ---")
     token = get_api_token()
     if not token:
         return
@@ -367,72 +624,89 @@ def main():
     output_col = "court_decision_links"
 
     if not input_file.exists():
-        logging.error(f"Input file not found at: {input_file}")
+        log.error("Input file not found at: %s", input_file)
         return
 
     try:
-        df = pd.read_csv(input_file, dtype=str).fillna('')
-        logging.info(f"Loaded {len(df)} rows from {input_file}.")
-
-        if debtor_col not in df.columns or creditor_col not in df.columns:
-            logging.error(f"CSV must contain '{debtor_col}' and '{creditor_col}' columns.")
-            return
+        # Read only the INN pairs up front; the full rows are streamed again when writing the output
+        with open(input_file, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            if debtor_col not in fieldnames or creditor_col not in fieldnames:
+                log.error("CSV must contain '%s' and '%s' columns.", debtor_col, creditor_col)
+                return
+            row_count = 0
+            unique_keys: Dict[Tuple[str, str], None] = {}
+            for row in reader:
+                row_count += 1
+                unique_keys[read_inn_pair(row, debtor_col, creditor_col)] = None
+        log.info("Loaded %s rows from %s.", row_count, input_file)
 
         # Load all caches
-        search_cache = load_cache(search_cache_file)
-        case_info_cache = load_cache(case_info_cache_file)
-        results_cache = load_cache(results_cache_file)
+        search_cache = open_cache(search_cache_file, pair_keys=True)
+        case_info_cache = open_cache(case_info_cache_file, max_age=CASE_INFO_MAX_AGE)
+        results_cache = open_cache(results_cache_file, pair_keys=True)
 
-        # Create a key for unique INN pairs to process
-        df['cache_key'] = df[debtor_col].str.strip() + '|' + df[creditor_col].str.strip()
-        unique_keys = df['cache_key'].unique()
-        logging.info(f"Found {len(unique_keys)} unique INN pairs to process.")
+        log.info("Found %s unique INN pairs to process.", len(unique_keys))
 
         # Process only keys that are not already in the final results cache
         keys_to_fetch = [key for key in unique_keys if key not in results_cache]
-        logging.info(f"{len(keys_to_fetch)} pairs are new (or failed previously) and will be processed.")
+        log.info("%s pairs are new (or failed previously) and will be processed.", len(keys_to_fetch))
 
-        try:
-            for i, key in enumerate(keys_to_fetch):
-                logging.info(f"--- Processing new pair {i+1}/{len(keys_to_fetch)}: {key} ---")
+        # Cache persistence runs on its own thread so disk writes never stall the next API call
+        result_queue: "queue.Queue[Optional[Tuple[Tuple[str, str], str]]]" = queue.Queue(maxsize=RESULT_QUEUE_SIZE)
+        writer_thread = threading.Thread(
+            target=cache_writer, args=(result_queue, results_cache, (search_cache, case_info_cache, results_cache)), daemon=True
+        )
+        writer_thread.start()
 
-                try:
-                    debtor_inn, creditor_inn = key.split('|')
-                except ValueError:
-                    logging.warning(f"Skipping invalid key format: {key}")
-                    results_cache[key] = "Invalid INN pair key"
-                    continue
+        def process_key(key: Tuple[str, str]) -> str:
+            debtor_inn, creditor_inn = key
+            if not debtor_inn or not creditor_inn:
+                log.warning("Skipping invalid pair with empty INN: %s", key)
+                return "Invalid INN provided"
+            return process_inn_pair(token, debtor_inn, creditor_inn, search_cache, case_info_cache, MAX_PAGES_TO_FETCH)
 
-                if not debtor_inn or not creditor_inn:
-                    logging.warning(f"Skipping invalid pair with empty INN: {key}")
-                    result = "Invalid INN provided"
-                else:
-                    result = process_inn_pair(token, debtor_inn, creditor_inn, search_cache, case_info_cache, MAX_PAGES_TO_FETCH)
+        # Pairs are independent, so several are processed at once; API_RATE_LIMITER bounds the overall request rate
+        executor = ThreadPoolExecutor(max_workers=PAIR_WORKERS)
+        try:
+            futures = {executor.submit(process_key, key): key for key in keys_to_fetch}
+            for i, future in enumerate(as_completed(futures)):
+                key = futures[future]
+                result = future.result()
+                log.info("--- Finished pair %s/%s: %s ---", i+1, len(keys_to_fetch), key)
 
                 # Only cache final results, not retryable errors
                 if result != RESULT_API_RETRY_ERROR:
-                    results_cache[key] = result
-                    # Save all caches on success to prevent data loss
-                    save_cache(search_cache_file, search_cache)
-                    save_cache(case_info_cache_file, case_info_cache)
-                    save_cache(results_cache_file, results_cache)
+                    result_queue.put((key, result))
                 else:
-                    logging.warning(f"Pair {key} resulted in a network error. It will NOT be cached and will be retried on the next run.")
+                    log.warning("Pair %s resulted in a network error. It will NOT be cached and will be retried on the next run.", key)
 
         except LowBalanceError:
-            logging.warning("Low API balance detected. Halting processing and proceeding to save partial results.")
-
-        logging.info("Mapping results back to the DataFrame.")
-        df[output_col] = df['cache_key'].map(results_cache)
-        # Mark rows that were skipped due to errors for easy filtering
-        df[output_col].fillna(RESULT_API_RETRY_ERROR, inplace=True)
-
-        df.drop(columns=['cache_key'], inplace=True)
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
-        logging.info(f"--- Script Execution Finished. Results saved to {output_file} ---")
+            log.warning("Low API balance detected. Halting processing and proceeding to save partial results.")
+        finally:
+            # Pairs not yet started are dropped; they will be picked up again on the next run
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Drain the writer, then persist anything not yet written, including on unexpected errors
+            result_queue.put(None)
+            writer_thread.join()
+            for cache in (search_cache, case_info_cache, results_cache):
+                cache.close()
+
+        log.info("Writing results to the output CSV.")
+        out_fieldnames = fieldnames if output_col in fieldnames else fieldnames + [output_col]
+        with open(input_file, newline='', encoding='utf-8-sig') as f_in, \
+                open(output_file, 'w', newline='', encoding='utf-8-sig') as f_out:
+            writer = csv.DictWriter(f_out, fieldnames=out_fieldnames, lineterminator=os.linesep)
+            writer.writeheader()
+            for row in csv.DictReader(f_in):
+                # Mark rows that were skipped due to errors for easy filtering
+                row[output_col] = results_cache.get(read_inn_pair(row, debtor_col, creditor_col), RESULT_API_RETRY_ERROR)
+                writer.writerow(row)
+        log.info("--- Script Execution Finished. Results saved to %s ---", output_file)
 
     except Exception as e:
-        logging.error(f"An unexpected error occurred during file processing: {e}", exc_info=True)
+        log.error("An unexpected error occurred during file processing: %s", e, exc_info=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,37 @@
+import threading
+import time
+
+API_MAX_RATE = 5  # Sustained requests per second to api-cloud.ru, summed over every client of the API
+API_BURST = 5  # Requests that may start back to back after an idle period
+
+
+class TokenBucket:
+    """
+    Token-bucket limiter shared by all worker threads: up to `burst` calls may start
+    at once, after which tokens are refilled at `rate` per second.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self._rate = rate
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+# The one bucket for api-cloud.ru: fssp020_call and parse_court_links both import this instance,
+# so their calls in a process draw on a single rate budget rather than one each
+API_RATE_LIMITER = TokenBucket(API_MAX_RATE, API_BURST)
@@ -1,10 +1,35 @@
+import csv
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; pandas' C parser is used without it
+    pa = pa_csv = None
+
+def read_csv_as_strings(input_file):
+    """
+    Reads every column as text ('' for empty cells). With pyarrow the file is parsed by its
+    multithreaded reader; the column types are pinned to string from the header, because
+    pd.read_csv(engine='pyarrow') infers numbers first and strips leading zeros from INNs.
+    """
+    if pa_csv is None:
+        return pd.read_csv(input_file, dtype=str, engine='c', memory_map=True, na_filter=False)
+    with open(input_file, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader(f))
+    convert_options = pa_csv.ConvertOptions(
+        column_types={column: pa.string() for column in header}, strings_can_be_null=False, null_values=[]
+    )
+    return pa_csv.read_csv(input_file, convert_options=convert_options).to_pandas()
+
 def sort_by_descending_group_summa(input_file, output_file):
-    df = pd.read_csv(input_file, dtype=str).fillna('')
+    df = read_csv_as_strings(input_file)
     df['group_summa'] = pd.to_numeric(df['group_summa'], errors='coerce')
-    sorted_df = df.sort_values(by='group_summa', ascending=False)
+    # Stable argsort on the negated float array: descending, ties keep file order, NaN stays last
+    order = np.argsort(-df['group_summa'].to_numpy(dtype='float64'), kind='stable')
+    sorted_df = df.iloc[order]
     sorted_df.to_csv(output_file, index=False)
     print(f"Sorted data saved to {output_file}")
 
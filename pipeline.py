@@ -1,7 +1,8 @@
 import os
+import pandas as pd
 from fssp050_api_calls import main as run_api
-from fssp060_append_w_sum_recispdoc import extract_sum_recispdoc_from_csv, add_sum_recispdoc_to_csv
-from fssp070_sum_filter import process_csv
+from fssp060_append_w_sum_recispdoc import extract_sum_recispdoc, add_sum_recispdoc_to_df
+from fssp070_sum_filter import process_df
 from ferdesurs250_api_calls import main as run_fedresurs
 
 dir_name = 'pipeline_output'
@@ -11,22 +12,27 @@ def create_pipeline_dirs():
 
 def pipeline():
     """Execute the full data processing pipeline, including Fedresurs step with output dir."""
-    # Step 1: Make API calls and save raw responses
-    run_api(input_csv_path='example.csv', output_csv_path=f'{dir_name}/output.csv', fake_api=False)
+    # Intermediate results are passed between steps in memory; only the raw API log and the final CSV hit the disk
+    input_df = pd.read_csv('example.csv')
+
+    # Step 1: Make API calls (raw responses are still streamed to a dated JSONL file as they arrive)
+    responses = run_api(input_csv_path='example.csv', output_path=f'{dir_name}/output.jsonl', fake_api=False)
 
     # Step 2: Extract sum and recispdoc from responses
-    info = extract_sum_recispdoc_from_csv(f'{dir_name}/output.csv') 
-    
-    # Step 3: Append extracted data to original CSV
-    add_sum_recispdoc_to_csv('example.csv', info, f'{dir_name}/fssp_2.csv')
-    
-    # Step 4: Process and filter the data
-    process_csv(f'{dir_name}/fssp_2.csv', f'{dir_name}/3fssp.csv', 
-                filter_sum=True, include_groupsum=True)
+    info = extract_sum_recispdoc(responses)
+
+    # Step 3: Append extracted data to original rows
+    fssp_df = add_sum_recispdoc_to_df(input_df, info)
+    # The API may send sums as strings, and missing ones are 'Not Found'; process_df compares and adds them as numbers
+    fssp_df['sum'] = pd.to_numeric(fssp_df['sum'], errors='coerce')
+
+    # Step 4: Process and filter the data, saving the final table
+    final_df = process_df(fssp_df, filter_sum=True, include_groupsum=True)
+    final_df.to_csv(f'{dir_name}/3fssp.csv', index=False)
 
     # Step 5: Run Fedresurs API calls and save to output dir
-    run_fedresurs(input_csv_path=f'{dir_name}/3fssp.csv', output_dir=dir_name, fake_api=False)
+    run_fedresurs(output_dir=dir_name, fake_api=False, df=final_df)
 
 if __name__ == "__main__":
     create_pipeline_dirs()
-    pipeline()
\ No newline at end of file
+    pipeline()
@@ -0,0 +1,97 @@
+# Helpers shared by sum_extractor.py and link_decider.py
+import json
+import os
+import re
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+NON_DIGIT_RE = re.compile(r'\D')
+
+def digits_only(text: str) -> str:
+    """Keeps only the digits of text. A string that is already a bare number is returned without touching the regex."""
+    # isdecimal() accepts exactly the characters \d matches, so both paths agree
+    return text if text.isdecimal() else NON_DIGIT_RE.sub('', text)
+
+# --- Caching Functions ---
+
+def cache_log_path(cache_path: Path) -> Path:
+    """Path of the append-only JSONL log that holds entries not yet folded into the cache snapshot."""
+    return cache_path.with_name(cache_path.name + ".log")
+
+def append_cache_entry(log_path: Path, key: str, value) -> None:
+    """Appends one cache entry to the JSONL log, so each new result is on disk without rewriting the snapshot."""
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({key: value}, ensure_ascii=False) + "\n")
+
+def load_cache(cache_path: Path) -> Dict:
+    """Loads a generic cache from a JSON file and its JSONL log."""
+    cache = {}
+    if not cache_path.exists():
+        print(f"[INFO] Cache file not found at {cache_path}. Starting fresh.")
+    else:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+                print(f"[INFO] Loaded {len(cache)} items from cache: {cache_path}")
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"[WARNING] Could not read cache file {cache_path}: {e}. Starting with an empty cache.")
+            cache = {}
+
+    # Fold in entries logged after the last snapshot, then consolidate and start a fresh log
+    log_path = cache_log_path(cache_path)
+    if log_path.exists():
+        replayed = 0
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    cache.update(json.loads(line))
+                    replayed += 1
+                except json.JSONDecodeError:
+                    # Only the last line can be cut short, by a crash mid-write
+                    print(f"[WARNING] Skipping unreadable line in cache log {log_path}.")
+        print(f"[INFO] Replayed {replayed} entries from cache log: {log_path}")
+        if save_cache(cache_path, cache):
+            log_path.unlink()
+    return cache
+
+def save_cache(cache_path: Path, data: Dict) -> bool:
+    """Saves a generic cache to a JSON file atomically. Returns True on success."""
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        # Write a temporary file and swap it in, so a crash mid-write never leaves a truncated cache
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, cache_path)
+        return True
+    except IOError as e:
+        print(f"[ERROR] Could not save cache to {cache_path}: {e}")
+        return False
+
+# --- INN Pair Helpers ---
+
+def factorize_pairs(df: pd.DataFrame) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Numbers the (creditor_inn, debtor_inn) pair of every row. Returns the per-row pair codes and the
+    "creditor|debtor" cache key of each distinct pair, so key strings are built once per pair rather than
+    once per row. A pair with a missing INN gets no key (None).
+    """
+    codes, pairs = pd.factorize(pd.MultiIndex.from_arrays(
+        [df['creditor_inn'].astype(str), df['debtor_inn'].astype(str)]
+    ))
+    keys = [f"{creditor}|{debtor}" if isinstance(creditor, str) and isinstance(debtor, str) else None
+            for creditor, debtor in pairs]
+    return codes, keys
+
+def first_row_per_pair(pair_codes: np.ndarray, row_mask: np.ndarray) -> np.ndarray:
+    """Positions of the first row of each pair among the rows selected by `row_mask`, in file order."""
+    rows = np.flatnonzero(row_mask)
+    _, first = np.unique(pair_codes[rows], return_index=True)
+    return np.sort(rows[first])
+
+def gather_pair_results(pair_codes: np.ndarray, pair_keys: List[Optional[str]], results: Dict[str, str]) -> np.ndarray:
+    """Looks each pair's result up once and spreads it to all of the pair's rows (NaN when there is none)."""
+    per_pair = np.array([results.get(key, np.nan) if key is not None else np.nan for key in pair_keys], dtype=object)
+    return per_pair[pair_codes]
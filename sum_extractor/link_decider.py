@@ -1,59 +1,66 @@
+import numpy as np
 import pandas as pd
-import json
+import atexit
+import functools
 import re
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Any
-
-# --- Caching Functions (Reused from previous scripts) ---
-
-def load_cache(cache_path: Path) -> Dict[str, str]:
-    """Loads the results cache from a JSON file."""
-    if not cache_path.exists():
-        print(f"[INFO] Cache file not found at {cache_path}. Starting fresh.")
-        return {}
-    try:
-        with open(cache_path, "r", encoding="utf-8") as f:
-            cache = json.load(f)
-            print(f"[INFO] Loaded {len(cache)} items from cache: {cache_path}")
-            return cache
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"[WARNING] Could not read cache file {cache_path}: {e}. Starting with an empty cache.")
-        return {}
-
-def save_cache(cache_path: Path, data: Dict[str, str]):
-    """Saves the cache to a JSON file."""
-    try:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-    except IOError as e:
-        print(f"[ERROR] Could not save cache to {cache_path}: {e}")
+from typing import List, Dict, Optional, Any, Tuple
+from extractor_utils import (
+    append_cache_entry, cache_log_path, digits_only, factorize_pairs, first_row_per_pair,
+    gather_pair_results, load_cache, save_cache,
+)
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the numeric helpers then run as plain NumPy
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# --- Constants ---
+FLUSH_INTERVAL_SECONDS = 5  # Rewrite the dirty cache file at most this often...
+FLUSH_EVERY_PAIRS = 50      # ...or after this many processed pairs, whichever comes first
+
+# Compiled once instead of on every cell
+# This regex handles dates and potential leading text before the date.
+DATE_KV_RE = re.compile(r"(\d{2}\.\d{2}\.\d{4}):\s*(.*)")
 
 # --- Data Parsing Functions ---
 
-def parse_key_value_lines(cell_content: str) -> Dict[str, str]:
-    """Parses a cell with 'key: value' lines into a dictionary."""
+@functools.lru_cache(maxsize=4096)
+def parse_key_value_lines(cell_content: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Parses a cell with 'key: value' lines into (key, value) items; pass them to dict().
+    Memoized because the same cell text often repeats across pairs, so the result is an immutable tuple.
+    """
     if not isinstance(cell_content, str):
-        return {}
+        return ()
     
     data_dict = {}
-    # This regex handles dates and potential leading text before the date.
-    pattern = re.compile(r"(\d{2}\.\d{2}\.\d{4}):\s*(.*)")
     for line in cell_content.splitlines():
-        match = pattern.search(line.strip())
+        # The date may follow leading text, so only the required literals can be checked before the regex
+        if ':' not in line or '.' not in line:
+            continue
+        match = DATE_KV_RE.search(line.strip())
         if match:
             key, value = match.groups()
             data_dict[key.strip()] = value.strip()
-    return data_dict
+    return tuple(data_dict.items())
 
 def parse_sum_value(sum_str: str) -> Optional[int]:
     """Safely converts a string from 'ai_debt_sums' into an integer."""
     if not sum_str or "AI_FAILED" in sum_str:
         return None
-    cleaned_number = re.sub(r'\D', '', sum_str)
+    cleaned_number = digits_only(sum_str)
     return int(cleaned_number) if cleaned_number else None
 
 # --- Core Decision Logic Function ---
 
+@njit(cache=True)
+def closest_sum_index(sums: np.ndarray, summa_ip: float) -> int:
+    """Index of the sum closest to summa_ip; the first one wins a tie. JIT-compiled when numba is installed."""
+    return np.abs(sums - summa_ip).argmin()
+
 def select_best_decision(summa_ip: float, decision_data: List[Dict[str, Any]]) -> str:
     """
     Applies the decision logic to select the best link(s).
@@ -85,15 +92,11 @@ def select_best_decision(summa_ip: float, decision_data: List[Dict[str, Any]]) -
 
     # Case 2: Multiple valid decisions, find the one with the minimum difference
     if len(valid_decisions) > 1:
-        min_diff = float('inf')
-        best_decision = None
-
-        for decision in valid_decisions:
-            diff = abs(decision['sum'] - summa_ip)
-            if diff < min_diff:
-                min_diff = diff
-                best_decision = decision
-        
+        # argmin returns the first of equally close sums, like the strict '<' scan it replaces.
+        # float64 rather than int64: a garbled AI answer can have more digits than int64 holds.
+        sums = np.fromiter((d['sum'] for d in valid_decisions), dtype=np.float64, count=len(valid_decisions))
+        best_decision = valid_decisions[int(closest_sum_index(sums, summa_ip))]
+
         # The prompt implies only one final link is chosen.
         # If multiple are needed, the logic here would change.
         return f"{best_decision['date']}: {best_decision['link']}"
@@ -119,30 +122,47 @@ def main(input_path: str, output_path: str, cache_path: Path):
 
     results_cache = load_cache(cache_path)
 
-    df['pair_key'] = df['creditor_inn'].astype(str) + '|' + df['debtor_inn'].astype(str)
+    pair_codes, pair_keys = factorize_pairs(df)
     df['final_decision_link'] = pd.NA
 
-    # Get unique pairs to process
-    unique_pairs_df = df.dropna(subset=['links', 'ai_debt_sums']).drop_duplicates(subset=['pair_key'])
-    
+    # Get unique pairs to process, zipping column arrays instead of building a Series per row
+    rows = first_row_per_pair(pair_codes, (df['links'].notna() & df['ai_debt_sums'].notna()).to_numpy())
     pairs_to_process = [
-        (row['pair_key'], row['summa'], row['links'], row['ai_debt_sums'])
-        for _, row in unique_pairs_df.iterrows()
-        if row['pair_key'] not in results_cache
+        pair for pair in zip(
+            [pair_keys[code] for code in pair_codes[rows]],
+            df['summa'].to_numpy()[rows],
+            df['links'].to_numpy()[rows],
+            df['ai_debt_sums'].to_numpy()[rows],
+        )
+        if pair[0] is not None and pair[0] not in results_cache
     ]
 
+    # Rewriting the whole JSON cache after every pair is quadratic in the number of pairs,
+    # so each new entry is appended to the cache log and the snapshot is rewritten periodically and on exit.
+    cache_dirty = False
+
+    def flush_cache():
+        nonlocal cache_dirty
+        # A saved snapshot holds everything in the log, so the log starts over
+        if cache_dirty and save_cache(cache_path, results_cache):
+            cache_log_path(cache_path).unlink(missing_ok=True)
+            cache_dirty = False
+            print("  [CACHE SAVED] Progress saved to disk.")
+
     if not pairs_to_process:
         print("\n[INFO] All unique pairs are already in the cache. No new processing needed.")
     else:
         total_new = len(pairs_to_process)
         print(f"\n[INFO] Found {total_new} new unique pairs to process.")
-        
+        atexit.register(flush_cache)  # an interrupted run still keeps what it already computed
+        last_flush = time.monotonic()
+
         for i, (key, summa_ip, links_cell, sums_cell) in enumerate(pairs_to_process):
             print(f"\n--- Processing Pair {i + 1}/{total_new}: {key} ---")
             
             # 1. Parse all the data sources
-            links_map = parse_key_value_lines(links_cell)
-            sums_map = parse_key_value_lines(sums_cell)
+            links_map = dict(parse_key_value_lines(links_cell))
+            sums_map = dict(parse_key_value_lines(sums_cell))
             
             # 2. Combine into a unified data structure
             decision_data = []
@@ -159,15 +179,20 @@ def main(input_path: str, output_path: str, cache_path: Path):
             
             print(f"  [RESULT] Selected: {final_decision}")
             
-            # 4. Cache and save
+            # 4. Cache, saving to disk in batches
             results_cache[key] = final_decision
-            save_cache(cache_path, results_cache)
-            print("  [CACHE SAVED] Progress saved to disk.")
+            append_cache_entry(cache_log_path(cache_path), key, final_decision)
+            cache_dirty = True
+            if (i + 1) % FLUSH_EVERY_PAIRS == 0 or time.monotonic() - last_flush > FLUSH_INTERVAL_SECONDS:
+                flush_cache()
+                last_flush = time.monotonic()
+
+        flush_cache()
+        atexit.unregister(flush_cache)
 
     # Map results back to the entire DataFrame
     print("\n[INFO] Mapping results back to the DataFrame...")
-    df['final_decision_link'] = df['pair_key'].map(results_cache)
-    df.drop(columns=['pair_key'], inplace=True)
+    df['final_decision_link'] = gather_pair_results(pair_codes, pair_keys, results_cache)
 
     df.to_csv(output_path, index=False)
     print(f"\n--- All Done! ---\nFinal results saved to: {output_path}")
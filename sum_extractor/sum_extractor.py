@@ -1,11 +1,18 @@
 import pandas as pd
 import requests
+import atexit
+import functools
 import os
-import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, Sequence
 from dotenv import load_dotenv
+from extractor_utils import (
+    append_cache_entry, cache_log_path, digits_only, factorize_pairs, first_row_per_pair,
+    gather_pair_results, load_cache, save_cache,
+)
 
 # --- Configuration ---
 load_dotenv()
@@ -14,51 +21,43 @@ load_dotenv()
 API_KEY = os.getenv("OPENROUTER_API_KEY")
 OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 MODEL_NAME = "qwen/qwen3-235b-a22b-07-25"
+FLUSH_INTERVAL_SECONDS = 5  # Rewrite dirty cache files at most this often...
+FLUSH_EVERY_PAIRS = 50      # ...or after this many processed pairs, whichever comes first
 
-# --- Caching Functions (Unchanged) ---
+# Compiled once instead of on every cell
+# No DOTALL: the pattern runs on single lines from splitlines(), so '.' never needs to cross a newline
+DATE_TEXT_RE = re.compile(r"^(\d{2}\.\d{2}\.\d{4}):\s*(.*)")
 
-def load_cache(cache_path: Path) -> Dict:
-    """Loads a generic cache from a JSON file."""
-    if not cache_path.exists():
-        print(f"[INFO] Cache file not found at {cache_path}. Starting fresh.")
-        return {}
-    try:
-        with open(cache_path, "r", encoding="utf-8") as f:
-            cache = json.load(f)
-            print(f"[INFO] Loaded {len(cache)} items from cache: {cache_path}")
-            return cache
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"[WARNING] Could not read cache file {cache_path}: {e}. Starting with an empty cache.")
-        return {}
-
-def save_cache(cache_path: Path, data: Dict):
-    """Saves a generic cache to a JSON file."""
-    try:
-        with open(cache_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-    except IOError as e:
-        print(f"[ERROR] Could not save cache to {cache_path}: {e}")
+AI_WORKERS = 8  # OpenRouter calls in flight at once for one pair; they wait on the model, not the CPU
+
+# One keep-alive session, so the TLS handshake is paid once instead of on every AI call
+SESSION = requests.Session()
 
 # --- Data Parsing Function (Unchanged) ---
 
-def parse_texts_from_cell(cell_content: str) -> List[Tuple[str, str]]:
+@functools.lru_cache(maxsize=4096)
+def parse_texts_from_cell(cell_content: str) -> Tuple[Tuple[str, str], ...]:
     """
-    Parses the 'links_texts' column content into a list of (date, text) tuples.
+    Parses the 'links_texts' column content into a tuple of (date, text) tuples.
+    Memoized because the same cell text often repeats across pairs, so the result is immutable.
     """
     if not isinstance(cell_content, str) or not cell_content.strip():
-        return []
-    pattern = re.compile(r"^(\d{2}\.\d{2}\.\d{4}):\s*(.*)", re.DOTALL)
+        return ()
     parsed_data = []
     for line in cell_content.splitlines():
         line = line.strip()
-        if not line or "Failed to extract content" in line:
+        # Cheap positional check for the leading "DD.MM.YYYY:" first (this also drops empty lines),
+        # then the substring scan, and only then the regex
+        if len(line) < 11 or line[2] != '.' or line[5] != '.' or line[10] != ':':
             continue
-        match = pattern.match(line)
+        if "Failed to extract content" in line:
+            continue
+        match = DATE_TEXT_RE.match(line)
         if match:
             date, text = match.groups()
             if len(text.strip()) > 50: 
                 parsed_data.append((date.strip(), text.strip()))
-    return parsed_data
+    return tuple(parsed_data)
 
 # --- AI Interaction Function (Unchanged) ---
 
@@ -84,11 +83,11 @@ def get_debt_from_ai(text: str) -> Optional[int]:
     headers = {"Authorization": f"Bearer {API_KEY}"}
     payload = {"model": MODEL_NAME, "messages": [{"role": "user", "content": prompt}]}
     try:
-        response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=90)
+        response = SESSION.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=90)
         response.raise_for_status()
         api_response = response.json()
         ai_result_text = api_response['choices'][0]['message']['content'].strip()
-        cleaned_number = re.sub(r'\D', '', ai_result_text)
+        cleaned_number = digits_only(ai_result_text)
         if cleaned_number:
             return int(cleaned_number)
         else:
@@ -107,7 +106,7 @@ def get_debt_from_ai(text: str) -> Optional[int]:
 # --- Helper function to process texts for a single pair (Unchanged) ---
 
 def process_pair_texts(
-    texts_to_process: List[Tuple[str, str]], 
+    texts_to_process: Sequence[Tuple[str, str]], 
     ai_cache: Dict[str, Optional[int]]
 ) -> Tuple[str, bool]:
     """
@@ -116,16 +115,24 @@ def process_pair_texts(
     """
     pair_results = []
     ai_cache_updated = False
+
+    # Also retry if the cached result was a failure (None). Each distinct text is sent once.
+    misses = list(dict.fromkeys(
+        text for _, text in texts_to_process if text not in ai_cache or ai_cache[text] is None
+    ))
+    if misses:
+        print(f"  [AI CACHE MISS or RETRY] Calling AI API for {len(misses)} text(s)...")
+        # The calls run concurrently; results are stored from this thread only, so the cache needs no lock
+        with ThreadPoolExecutor(max_workers=min(AI_WORKERS, len(misses))) as executor:
+            futures = {executor.submit(get_debt_from_ai, text): text for text in misses}
+            for future in as_completed(futures):
+                ai_cache[futures[future]] = future.result()
+        ai_cache_updated = True
+
+    # Report in the original date order
     for date, text in texts_to_process:
         print(f"  - Analyzing text for date: {date}")
-        if text in ai_cache and ai_cache[text] is not None: # Also retry if the cached result was a failure (None)
-            print("    [AI CACHE HIT] Found text snippet in AI cache.")
-            debt_sum = ai_cache[text]
-        else:
-            print("    [AI CACHE MISS or RETRY] Calling AI API...")
-            debt_sum = get_debt_from_ai(text)
-            ai_cache[text] = debt_sum
-            ai_cache_updated = True
+        debt_sum = ai_cache[text]
 
         if debt_sum is not None:
             pair_results.append(f"{date}: {debt_sum}")
@@ -154,9 +161,13 @@ def main(input_path: str, output_path: str, results_cache_path: Path, ai_cache_p
     results_cache: Dict[str, str] = load_cache(results_cache_path)
     ai_cache: Dict[str, Optional[int]] = load_cache(ai_cache_path)
 
-    df['pair_key'] = df['creditor_inn'].astype(str) + '|' + df['debtor_inn'].astype(str)
-    unique_pairs_df = df.dropna(subset=['links_texts']).drop_duplicates(subset=['pair_key'])
-    pairs_to_process_map = dict(zip(unique_pairs_df['pair_key'], unique_pairs_df['links_texts']))
+    pair_codes, pair_keys = factorize_pairs(df)
+    links_texts = df['links_texts'].to_numpy()
+    pairs_to_process_map = {
+        pair_keys[pair_codes[row]]: links_texts[row]
+        for row in first_row_per_pair(pair_codes, df['links_texts'].notna().to_numpy())
+        if pair_keys[pair_codes[row]] is not None
+    }
 
     # Filter for pairs that are either NOT in the cache OR have a failed result in the cache.
     new_pairs_to_process = {
@@ -164,12 +175,31 @@ def main(input_path: str, output_path: str, results_cache_path: Path, ai_cache_p
         if key not in results_cache or "AI_FAILED" in results_cache.get(key, "") # <<< MODIFIED LINE
     }
 
+    # Rewriting a whole JSON cache after every pair is quadratic in the number of pairs,
+    # so each new entry is appended to the cache's log and the snapshots are rewritten periodically and on exit.
+    results_dirty = False
+    ai_dirty = False
+
+    def flush_caches():
+        nonlocal results_dirty, ai_dirty
+        # A saved snapshot holds everything in its log, so the log starts over
+        if results_dirty and save_cache(results_cache_path, results_cache):
+            cache_log_path(results_cache_path).unlink(missing_ok=True)
+            results_dirty = False
+            print("  [RESULTS CACHE SAVED] Progress saved.")
+        if ai_dirty and save_cache(ai_cache_path, ai_cache):
+            cache_log_path(ai_cache_path).unlink(missing_ok=True)
+            ai_dirty = False
+            print("  [AI CACHE SAVED] AI text cache updated.")
+
     if not new_pairs_to_process:
         print("\n[INFO] All unique pairs are already successfully processed. No new work to do.")
     else:
         total_new_pairs = len(new_pairs_to_process)
         print(f"\n[INFO] Found {total_new_pairs} new or failed pairs to process.")
-        
+        atexit.register(flush_caches)  # an interrupted run still keeps what it already paid for
+        last_flush = time.monotonic()
+
         for i, (key, links_texts_content) in enumerate(new_pairs_to_process.items()):
             print(f"\n--- Processing Pair {i + 1}/{total_new_pairs}: {key} ---")
             
@@ -177,21 +207,29 @@ def main(input_path: str, output_path: str, results_cache_path: Path, ai_cache_p
             if not texts_for_pair:
                 print("  No valid texts found for this pair. Skipping.")
                 results_cache[key] = "NO_VALID_TEXTS"
+                append_cache_entry(cache_log_path(results_cache_path), key, "NO_VALID_TEXTS")
+                results_dirty = True
                 continue
 
             final_result_string, ai_cache_was_updated = process_pair_texts(texts_for_pair, ai_cache)
             
             results_cache[key] = final_result_string
-            save_cache(results_cache_path, results_cache)
-            print(f"  [RESULTS CACHE SAVED] Progress for pair {key} saved.")
-
+            append_cache_entry(cache_log_path(results_cache_path), key, final_result_string)
+            results_dirty = True
             if ai_cache_was_updated:
-                save_cache(ai_cache_path, ai_cache)
-                print("  [AI CACHE SAVED] AI text cache updated.")
+                for _, text in texts_for_pair:
+                    append_cache_entry(cache_log_path(ai_cache_path), text, ai_cache[text])
+                ai_dirty = True
+
+            if (i + 1) % FLUSH_EVERY_PAIRS == 0 or time.monotonic() - last_flush > FLUSH_INTERVAL_SECONDS:
+                flush_caches()
+                last_flush = time.monotonic()
+
+        flush_caches()
+        atexit.unregister(flush_caches)
 
     print("\n[INFO] Mapping results back to the DataFrame...")
-    df['ai_debt_sums'] = df['pair_key'].map(results_cache)
-    df.drop(columns=['pair_key'], inplace=True)
+    df['ai_debt_sums'] = gather_pair_results(pair_codes, pair_keys, results_cache)
 
     df.to_csv(output_path, index=False)
     print(f"\n--- All Done! ---\nResults saved to: {output_path}")